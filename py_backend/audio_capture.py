@@ -6,80 +6,59 @@ This allows us to record any audio playing on the system
 (YouTube, Spotify, local files, etc.)
 """
 
-import sys
-sys.argv = sys.argv or ['audio_capture']  # Fix soundcard argv bug
-
-import numpy as np
-import soundcard as sc
+from audio_timeline import AudioTimeline
+from audio_source import LoopbackSource, get_loopback_device  # noqa: F401 (re-export)
 
 # Audio settings
 SAMPLE_RATE = 44100
 BLOCK_SIZE = 4096
-
-
-def get_loopback_device():
-    """
-    Find the system audio loopback device.
-    On Linux (PulseAudio), this is usually called "Monitor of..."
-    """
-    try:
-        mics = sc.all_microphones(include_loopback=True)
-        for mic in mics:
-            # Look for loopback/monitor device
-            if "monitor" in mic.name.lower() or "loopback" in mic.name.lower():
-                return mic
-        # Fallback to default
-        return sc.default_microphone()
-    except Exception as e:
-        print(f"Error finding audio device: {e}")
-        return None
+BUFFER_DURATION = 30  # Seconds of audio kept in the buffer
 
 
 class AudioCapture:
-    """Captures system audio into a buffer for processing."""
+    """Captures audio from an AudioSource into a buffer for processing."""
 
-    def __init__(self, sample_rate=SAMPLE_RATE, block_size=BLOCK_SIZE):
+    def __init__(self, sample_rate=SAMPLE_RATE, block_size=BLOCK_SIZE,
+                 buffer_duration=BUFFER_DURATION, source=None):
         self.sample_rate = sample_rate
         self.block_size = block_size
-        self.device = None
-        self.recorder = None
-        self.buffer = np.array([], dtype=np.float32)
+        self.source = source or LoopbackSource(sample_rate, block_size)
+        self.timeline = AudioTimeline(sample_rate, buffer_duration)
+        self.cursor = self.timeline.cursor()
+        self._opened = False
 
     def start(self):
         """Initialize the audio capture device."""
-        self.device = get_loopback_device()
-        if not self.device:
-            raise RuntimeError("No audio loopback device found")
-        return self.device.name
+        self.source.open()
+        self._opened = True
+        return self.source.name
 
     def read_chunk(self):
-        """Read a chunk of audio data."""
-        if not self.recorder:
-            self.recorder = self.device.recorder(samplerate=self.sample_rate)
-            self.recorder.__enter__()
+        """
+        Read a chunk of audio data (None once the source is exhausted).
 
-        data = self.recorder.record(numframes=self.block_size)
-        # Convert stereo to mono
-        mono = data.mean(axis=1).astype(np.float32)
-        return mono
+        Returns a copy the caller owns: the source's blocks come from a
+        reused buffer pool and are overwritten a few reads later.
+        """
+        if not self._opened:
+            self.start()
+        chunk = self.source.read_block()
+        return None if chunk is None else chunk.copy()
 
     def add_to_buffer(self, chunk):
         """Add audio chunk to buffer."""
-        self.buffer = np.concatenate((self.buffer, chunk))
+        self.timeline.write(chunk)
 
     def get_buffer(self, seconds):
-        """Get last N seconds from buffer."""
-        samples = int(seconds * self.sample_rate)
-        if len(self.buffer) >= samples:
-            return self.buffer[-samples:]
-        return self.buffer
+        """Get last N seconds from buffer (read-only view, valid until the next write)."""
+        return self.cursor.window(int(seconds * self.sample_rate))
 
     def clear_buffer(self):
         """Clear the audio buffer."""
-        self.buffer = np.array([], dtype=np.float32)
+        self.cursor.seek_to_end()
 
     def stop(self):
         """Stop recording."""
-        if self.recorder:
-            self.recorder.__exit__(None, None, None)
-            self.recorder = None
+        if self._opened:
+            self.source.close()
+            self._opened = False
@@ -0,0 +1,335 @@
+"""
+Audio Source Module
+
+Pluggable sources of mono float32 audio blocks.
+
+- LoopbackSource: system audio via the PulseAudio loopback/monitor device
+- FileReplaySource: a local WAV/FLAC file replayed at 1x or N-times real
+  time on a virtual clock, for headless runs, CI and benchmarks
+"""
+
+import threading
+import time
+import numpy as np
+import scipy.io.wavfile as wav
+from math import gcd
+from scipy.signal import resample_poly
+
+from device_manager import get_device_manager
+
+try:
+    import soundfile
+except ImportError:  # Optional: only needed for FLAC/OGG replay
+    soundfile = None
+
+# Audio settings
+SAMPLE_RATE = 44100
+BLOCK_SIZE = 4096
+BLOCK_POOL_SIZE = 34  # Capture queue size + block being filled + block being consumed
+SINK_POLL_INTERVAL = 2.0  # Seconds between default-sink change checks
+LOOPBACK_SYNC_DELAY = 2.0  # By-ear delay of the loopback path, device latency included
+RECONNECT_RETRY_DELAY = 0.5  # Seconds before retrying a failed reconnect; doubles per attempt
+MAX_RECONNECT_DELAY = 8.0
+
+# Downmix strategies for multichannel capture
+DOWNMIX_MEAN = "mean"    # Average of all channels
+DOWNMIX_LEFT = "left"    # First channel only
+DOWNMIX_RIGHT = "right"  # Second channel only
+DOWNMIX_MID = "mid"      # (L + R) / 2, ignoring surround/LFE channels
+DOWNMIX_STRATEGIES = (DOWNMIX_MEAN, DOWNMIX_LEFT, DOWNMIX_RIGHT, DOWNMIX_MID)
+
+
+def get_loopback_device():
+    """
+    Find the system audio loopback device.
+    On Linux (PulseAudio), this is usually called "Monitor of..."
+    Enumeration errors propagate so the caller can report them.
+    """
+    return get_device_manager().loopback_device()
+
+
+def reconnect_delay(attempt):
+    """Exponential backoff before reconnect attempt number `attempt` (from 0)."""
+    return min(RECONNECT_RETRY_DELAY * 2 ** attempt, MAX_RECONNECT_DELAY)
+
+
+def load_audio_file(path, sample_rate=SAMPLE_RATE):
+    """
+    Load an audio file as mono float32 at `sample_rate`.
+
+    WAV is read with scipy; other formats (FLAC, OGG) need soundfile.
+    """
+    if str(path).lower().endswith(".wav"):
+        file_rate, data = wav.read(path)
+        if data.dtype == np.uint8:
+            data = (data.astype(np.float32) - 128) / 128
+        elif np.issubdtype(data.dtype, np.integer):
+            data = data.astype(np.float32) / np.iinfo(data.dtype).max
+        else:
+            data = data.astype(np.float32)
+    else:
+        if soundfile is None:
+            raise RuntimeError(f"soundfile is required to read {path}")
+        data, file_rate = soundfile.read(path, dtype="float32")
+
+    if data.ndim > 1:
+        data = data.mean(axis=1)
+    if file_rate != sample_rate:
+        g = gcd(int(file_rate), int(sample_rate))
+        data = resample_poly(data, sample_rate // g, file_rate // g)
+    return np.ascontiguousarray(data, dtype=np.float32)
+
+
+class Downmixer:
+    """
+    Downmixes (frames, channels) float32 blocks into preallocated mono
+    buffers.
+
+    Output buffers come from a fixed pool used round-robin, so a block
+    stays valid while up to `pool_size - 1` newer blocks are produced
+    (enough to cover everything sitting in the capture queue).
+    """
+
+    def __init__(self, block_size=BLOCK_SIZE, strategy=DOWNMIX_MEAN, pool_size=BLOCK_POOL_SIZE):
+        if strategy not in DOWNMIX_STRATEGIES:
+            raise ValueError(f"Unknown downmix strategy: {strategy}")
+        self.strategy = strategy
+        self._pool = [np.zeros(block_size, dtype=np.float32) for _ in range(pool_size)]
+        self._next = 0
+
+    def __call__(self, data):
+        out = self._pool[self._next]
+        self._next = (self._next + 1) % len(self._pool)
+        if len(data) != len(out):
+            out = out[:len(data)]
+
+        channels = data.shape[1] if data.ndim > 1 else 1
+        if channels == 1:
+            np.copyto(out, data.reshape(len(data)), casting="same_kind")
+        elif self.strategy == DOWNMIX_LEFT:
+            np.copyto(out, data[:, 0], casting="same_kind")
+        elif self.strategy == DOWNMIX_RIGHT:
+            np.copyto(out, data[:, 1], casting="same_kind")
+        elif self.strategy == DOWNMIX_MID or channels == 2:
+            np.add(data[:, 0], data[:, 1], out=out, casting="same_kind")
+            out *= 0.5
+        else:
+            np.add.reduce(data, axis=1, out=out)
+            out *= 1.0 / channels
+        return out
+
+
+class AudioSource:
+    """
+    Base class for audio sources.
+
+    Subclasses produce mono float32 blocks of `block_size` frames from
+    read_block() and expose the clock their timestamps are measured on.
+    """
+
+    name = "audio source"
+    realtime = True  # Blocks arrive on the device's schedule; drop rather than fall behind
+    calibrated_delay = 0.0  # Seconds from sound to delivery found by ear, device latency included
+
+    def __init__(self, sample_rate=SAMPLE_RATE, block_size=BLOCK_SIZE):
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        # Reconnect metrics (sources that can lose their device)
+        self.reconnects = 0
+        self.last_reconnect_duration = None  # Seconds from loss to recording again
+
+    def open(self):
+        """Acquire the underlying device or file."""
+
+    def read_block(self):
+        """Block until the next chunk is available. Returns None at end of stream."""
+        raise NotImplementedError
+
+    def close(self):
+        """Release the underlying device or file."""
+
+    def interrupt(self):
+        """Make a blocked or retrying read_block() return None soon (any thread)."""
+
+    def clock(self):
+        """Current time on this source's clock, in seconds (monotonic)."""
+        return time.monotonic()
+
+    def device_latency(self):
+        """Seconds the device reports between sound and delivery, or None if unknown."""
+        return None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LoopbackSource(AudioSource):
+    """
+    Records system audio from the soundcard loopback device.
+
+    Blocks are downmixed into a reused buffer pool (see Downmixer), so the
+    only per-block allocation left is the array soundcard itself returns.
+
+    If recording fails or the default sink changes, the recorder is
+    reopened on the new monitor source inside read_block(); callers only
+    see a short pause and the `reconnects` counter going up. Retries back
+    off exponentially, never fall back to a microphone, and give up when
+    the source is closed or interrupted.
+    """
+
+    calibrated_delay = LOOPBACK_SYNC_DELAY
+
+    def __init__(self, sample_rate=SAMPLE_RATE, block_size=BLOCK_SIZE, device=None,
+                 downmix=DOWNMIX_MEAN, pool_size=BLOCK_POOL_SIZE, device_manager=None):
+        super().__init__(sample_rate, block_size)
+        self.device = device
+        self.recorder = None
+        self.downmix = Downmixer(block_size, downmix, pool_size)
+        self.devices = device_manager or get_device_manager()
+        self._next_sink_check = 0.0
+        self._stopped = threading.Event()
+
+    @property
+    def name(self):
+        return self.device.name if self.device else "loopback"
+
+    def open(self):
+        if not self.device:
+            self.device = get_loopback_device()
+        if not self.device:
+            raise RuntimeError("No audio loopback device found")
+        self._stopped.clear()
+        if self.devices.selected_sink is None:
+            self.devices.selected_sink = self.devices.default_sink()
+        self._open_recorder()
+
+    def _open_recorder(self):
+        self.recorder = self.device.recorder(samplerate=self.sample_rate)
+        self.recorder.__enter__()
+        self._next_sink_check = time.monotonic() + SINK_POLL_INTERVAL
+
+    def _close_recorder(self):
+        recorder, self.recorder = self.recorder, None
+        if recorder:
+            try:
+                recorder.__exit__(None, None, None)
+            except Exception:
+                pass  # The device may already be gone
+
+    def _reconnect(self):
+        """Reopen the recorder on the current loopback device until it works."""
+        started = time.monotonic()
+        self._close_recorder()
+        attempt = 0
+        while not self._stopped.is_set():
+            try:
+                self.device = self.devices.loopback_device(refresh=True, fallback=False)
+                self._open_recorder()
+            except Exception:
+                self._close_recorder()
+                self._stopped.wait(reconnect_delay(attempt))
+                attempt += 1
+                continue
+            self.reconnects += 1
+            self.last_reconnect_duration = time.monotonic() - started
+            return
+
+    def read_block(self):
+        if time.monotonic() >= self._next_sink_check:
+            self._next_sink_check = time.monotonic() + SINK_POLL_INTERVAL
+            if self.devices.sink_changed():
+                self._reconnect()
+        failures = 0
+        while not self._stopped.is_set():
+            try:
+                data = self.recorder.record(numframes=self.block_size)
+                return self.downmix(data)
+            except Exception:
+                if failures:
+                    # The device reopens but won't record; don't spin on it
+                    self._stopped.wait(reconnect_delay(failures - 1))
+                failures += 1
+                self._reconnect()
+        return None
+
+    def device_latency(self):
+        # soundcard exposes the stream latency on PulseAudio only
+        try:
+            return float(self.recorder.latency)
+        except Exception:
+            return None
+
+    def interrupt(self):
+        self._stopped.set()
+
+    def close(self):
+        self._stopped.set()
+        self._close_recorder()
+
+
+class FileReplaySource(AudioSource):
+    """
+    Streams a local audio file in `block_size` chunks.
+
+    Timestamps come from a virtual clock that advances with the frames
+    delivered, so runs are deterministic regardless of CPU speed.
+
+    Args:
+        path: WAV (or FLAC/OGG with soundfile installed) file
+        speed: 1.0 = real time, N = N-times real time, 0 = as fast as possible
+        loop: Restart from the beginning at end of file
+        start_time: Virtual clock value at frame 0
+    """
+
+    realtime = False  # Every block must be delivered; the queue makes replay wait instead
+
+    def __init__(self, path, sample_rate=SAMPLE_RATE, block_size=BLOCK_SIZE,
+                 speed=1.0, loop=False, start_time=0.0):
+        super().__init__(sample_rate, block_size)
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self.start_time = start_time
+        self.audio = None
+        self.frames_delivered = 0
+        self._position = 0
+        self._wall_start = None
+
+    @property
+    def name(self):
+        return f"replay:{self.path}"
+
+    def open(self):
+        if self.audio is None:
+            self.audio = load_audio_file(self.path, self.sample_rate)
+        self._position = 0
+        self.frames_delivered = 0
+        self._wall_start = time.monotonic()
+
+    def read_block(self):
+        if self._position >= len(self.audio):
+            if not self.loop or len(self.audio) == 0:
+                return None
+            self._position = 0
+
+        block = self.audio[self._position:self._position + self.block_size]
+        self._position += len(block)
+        self.frames_delivered += len(block)
+
+        # Pace delivery so the block "finishes recording" on schedule
+        if self.speed > 0:
+            due = self._wall_start + self.frames_delivered / (self.sample_rate * self.speed)
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        return block
+
+    def clock(self):
+        return self.start_time + self.frames_delivered / self.sample_rate
+
+    def device_latency(self):
+        return 0.0  # The virtual clock stamps frames exactly
@@ -0,0 +1,126 @@
+"""
+Audio Timeline Module
+
+One shared history of captured audio, indexed by absolute frame number.
+Consumers (identification, Whisper, meters, analyzers) each hold their
+own cursor into it instead of keeping private copies of the same PCM,
+so memory and copy cost do not grow with the number of consumers.
+"""
+
+import numpy as np
+from ring_buffer import RingBuffer
+
+
+class AudioTimeline:
+    """
+    Shared mono audio history backed by a single RingBuffer.
+
+    Frame numbers are absolute: frame 0 is the first frame ever captured
+    and `end_frame` is one past the newest. Only the last `duration`
+    seconds are retained.
+    """
+
+    def __init__(self, sample_rate, duration):
+        self.sample_rate = sample_rate
+        self.buffer = RingBuffer(int(sample_rate * duration))
+        self.end_frame = 0
+        self.end_time = None  # Capture timestamp of the newest frame
+
+    @property
+    def start_frame(self):
+        """Oldest frame still retained."""
+        return self.end_frame - len(self.buffer)
+
+    def write(self, block, timestamp=None, frame_index=None):
+        """
+        Append a captured block.
+
+        If `frame_index` is ahead of the timeline (blocks were dropped
+        upstream), the gap is filled with silence so frame numbers keep
+        matching capture time.
+        """
+        if frame_index is not None and frame_index > self.end_frame:
+            gap = min(frame_index - self.end_frame, self.buffer.capacity)
+            self.buffer.write(np.zeros(gap, dtype=np.float32))
+            self.end_frame = frame_index
+        self.buffer.write(block)
+        self.end_frame += len(block)
+        if timestamp is not None:
+            self.end_time = timestamp
+
+    def view(self, start, end=None):
+        """
+        Zero-copy read-only view of frames [start, end).
+
+        The range is clamped to what is still retained. Like
+        RingBuffer.latest(), the view is only valid until the next write.
+        """
+        if end is None or end > self.end_frame:
+            end = self.end_frame
+        start = max(start, self.start_frame)
+        if end <= start:
+            return self.buffer.latest(0)
+        return self.buffer.latest(self.end_frame - start)[:end - start]
+
+    def latest(self, frames):
+        """Zero-copy view of the newest `frames` frames."""
+        return self.buffer.latest(frames)
+
+    def frame_time(self, frame):
+        """Capture timestamp of an absolute frame number."""
+        if self.end_time is None:
+            return None
+        return self.end_time - (self.end_frame - frame) / self.sample_rate
+
+    def cursor(self, at_end=True):
+        """Create a new independent read cursor."""
+        return TimelineCursor(self, self.end_frame if at_end else self.start_frame)
+
+
+class TimelineCursor:
+    """
+    A consumer's read position on an AudioTimeline.
+
+    If the cursor falls further behind than the timeline retains, the
+    skipped frames are counted in `dropped` and reading resumes at the
+    oldest retained frame.
+    """
+
+    def __init__(self, timeline, position):
+        self.timeline = timeline
+        self.position = position
+        self.dropped = 0
+
+    def _catch_up(self):
+        start = self.timeline.start_frame
+        if self.position < start:
+            self.dropped += start - self.position
+            self.position = start
+
+    def available(self):
+        """Frames written since the cursor position."""
+        self._catch_up()
+        return self.timeline.end_frame - self.position
+
+    def read(self, max_frames=None):
+        """Return a view of unread frames (up to `max_frames`) and advance."""
+        self._catch_up()
+        end = self.timeline.end_frame
+        if max_frames is not None:
+            end = min(end, self.position + max_frames)
+        view = self.timeline.view(self.position, end)
+        self.position = end
+        return view
+
+    def window(self, frames):
+        """
+        View of the newest `frames` frames written since the cursor
+        position, without advancing.
+        """
+        self._catch_up()
+        start = max(self.position, self.timeline.end_frame - frames)
+        return self.timeline.view(start)
+
+    def seek_to_end(self):
+        """Mark everything written so far as consumed."""
+        self.position = self.timeline.end_frame
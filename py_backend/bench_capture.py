@@ -0,0 +1,87 @@
+"""
+Capture Path Benchmark
+
+Measures microseconds and transient allocations per block for the
+capture downmix path, comparing the old `data.mean(axis=1).astype()`
+path with each Downmixer strategy.
+
+Usage:
+    python bench_capture.py [--blocks N] [--channels C] [--check]
+
+With --check the script exits non-zero if any Downmixer strategy
+allocates per block, so regressions fail CI.
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from audio_source import BLOCK_SIZE, DOWNMIX_STRATEGIES, Downmixer
+
+# Bytes per block tolerated before --check fails (numpy scalars, views)
+ALLOCATION_BUDGET = 1024
+
+
+def legacy_downmix(data):
+    return data.mean(axis=1).astype(np.float32)
+
+
+def measure(fn, blocks):
+    """Return (microseconds per block, peak transient bytes per block)."""
+    for block in blocks[:8]:  # Warm up caches and lazy imports
+        fn(block)
+
+    start = time.perf_counter()
+    for block in blocks:
+        fn(block)
+    usec = (time.perf_counter() - start) / len(blocks) * 1e6
+
+    tracemalloc.start()
+    peak = 0
+    for block in blocks:
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        fn(block)
+        _, block_peak = tracemalloc.get_traced_memory()
+        peak = max(peak, block_peak - base)
+    tracemalloc.stop()
+    return usec, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=500)
+    parser.add_argument("--channels", type=int, default=2)
+    parser.add_argument("--block-size", type=int, default=BLOCK_SIZE)
+    parser.add_argument("--check", action="store_true",
+                        help="Fail if a Downmixer strategy allocates per block")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # Stand-in for what recorder.record() returns: (frames, channels) float32
+    blocks = [rng.standard_normal((args.block_size, args.channels), dtype=np.float32)
+              for _ in range(args.blocks)]
+
+    cases = [("legacy mean+astype", legacy_downmix)]
+    for strategy in DOWNMIX_STRATEGIES:
+        cases.append((f"downmix {strategy}", Downmixer(args.block_size, strategy)))
+
+    print(f"{args.blocks} blocks of {args.block_size} frames x {args.channels} channels")
+    print(f"{'path':<22}{'us/block':>10}{'alloc B/block':>16}")
+    failed = False
+    for name, fn in cases:
+        usec, peak = measure(fn, blocks)
+        print(f"{name:<22}{usec:>10.1f}{peak:>16}")
+        if isinstance(fn, Downmixer) and peak > ALLOCATION_BUDGET:
+            failed = True
+
+    if args.check and failed:
+        print("FAIL: downmix path allocates per block")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
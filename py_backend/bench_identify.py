@@ -0,0 +1,88 @@
+"""
+Identification Handoff Benchmark
+
+Compares the old temp-file handoff (write WAV to disk, recognizer reads
+it back, unlink) with handing in-memory WAV bytes to the recognizer.
+The recognizer call itself is left out so only the handoff is measured.
+
+Reports microseconds per attempt and, on Linux, read/write syscalls per
+attempt from /proc/self/io.
+
+Usage:
+    python bench_identify.py [--attempts N] [--seconds S]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import scipy.io.wavfile as wav
+
+from song_identifier import SAMPLE_RATE, encode_wav
+
+
+def tempfile_handoff(chunk):
+    audio_int16 = (chunk * 32767).astype(np.int16)
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
+        tmp_path = tmp.name
+        wav.write(tmp_path, SAMPLE_RATE, audio_int16)
+    try:
+        with open(tmp_path, "rb") as f:  # What the recognizer does with a path
+            return f.read()
+    finally:
+        os.unlink(tmp_path)
+
+
+def memory_handoff(chunk):
+    return encode_wav(chunk, SAMPLE_RATE)
+
+
+def io_counters():
+    """(syscr, syscw) for this process, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/io") as f:
+            fields = dict(line.split(":") for line in f)
+        return int(fields["syscr"]), int(fields["syscw"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def measure(fn, chunk, attempts):
+    fn(chunk)  # Warm up
+    before = io_counters()
+    start = time.perf_counter()
+    for _ in range(attempts):
+        fn(chunk)
+    usec = (time.perf_counter() - start) / attempts * 1e6
+    after = io_counters()
+    if before is None or after is None:
+        return usec, None, None
+    # Reading /proc/self/io itself costs one read syscall
+    reads = (after[0] - before[0] - 1) / attempts
+    writes = (after[1] - before[1]) / attempts
+    return usec, reads, writes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--attempts", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=10.0, help="Sample length")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    chunk = (0.1 * rng.standard_normal(int(args.seconds * SAMPLE_RATE))).astype(np.float32)
+
+    print(f"{args.attempts} attempts, {args.seconds:g}s at {SAMPLE_RATE} Hz")
+    print(f"{'handoff':<12}{'us/attempt':>12}{'read sc':>10}{'write sc':>10}")
+    for name, fn in (("tempfile", tempfile_handoff), ("in-memory", memory_handoff)):
+        usec, reads, writes = measure(fn, chunk, args.attempts)
+        if reads is None:
+            print(f"{name:<12}{usec:>12.1f}{'n/a':>10}{'n/a':>10}")
+        else:
+            print(f"{name:<12}{usec:>12.1f}{reads:>10.1f}{writes:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
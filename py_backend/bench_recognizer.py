@@ -0,0 +1,127 @@
+"""
+Identification Pipeline Benchmark
+
+Runs SongIdentifier.identify against the offline recognizer stand-in
+under configurable network conditions (latency distribution, error and
+throttle rates) and reports success rate, offset accuracy, end-to-end
+latency percentiles and requests per attempt (hedged windows included).
+No network or Shazam account needed.
+
+Without --script a synthetic track is generated and registered with the
+stand-in, and samples are cut from random positions of it.
+
+Usage:
+    python bench_recognizer.py --latency lognormal:1.5,0.6 --error-rate 0.1 --throttle-rate 0.05
+    python bench_recognizer.py --windows 1    # compare with unhedged single windows
+    python bench_recognizer.py --script rec/script.json --audio song.wav
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+from scipy.signal import resample_poly
+
+from audio_source import load_audio_file
+from fingerprint import FINGERPRINT_SAMPLE_RATE
+from hedging import HEDGE_WINDOWS
+from rate_limit import TokenBucket
+from recognizer_standin import StandInRecognizer
+from recognizers import SAMPLE_RATE
+from song_identifier import SongIdentifier
+
+
+def synthetic_track(seconds, rng):
+    """Chord sequence with a little noise; different every half second."""
+    t = np.arange(int(0.5 * SAMPLE_RATE)) / SAMPLE_RATE
+    notes = []
+    for _ in range(int(seconds * 2)):
+        chord = rng.integers(48, 84, size=3)
+        freqs = 440.0 * 2 ** ((chord - 69) / 12)
+        notes.append(sum(0.1 * np.sin(2 * np.pi * f * t) for f in freqs) * np.exp(-3 * t))
+    audio = np.concatenate(notes)
+    return (audio + 0.005 * rng.standard_normal(len(audio))).astype(np.float32)
+
+
+def percentile(values, p):
+    return float(np.percentile(values, p)) if values else 0.0
+
+
+async def run(identifier, track, args, rng):
+    sample = int(identifier.span_duration(args.seconds) * SAMPLE_RATE)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, offset_errors = [], []
+    identified = 0
+
+    async def attempt():
+        nonlocal identified
+        start_frame = int(rng.integers(0, len(track) - sample))
+        async with semaphore:
+            start = time.perf_counter()
+            result = await identifier.identify(track[start_frame:start_frame + sample],
+                                               SAMPLE_RATE, sample_duration=args.seconds)
+            latencies.append(time.perf_counter() - start)
+        if result:
+            identified += 1
+            offset_errors.append(abs(result['offset'] - start_frame / SAMPLE_RATE))
+
+    await asyncio.gather(*(attempt() for _ in range(args.attempts)))
+    return identified, latencies, offset_errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--attempts", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=1, help="Attempts in flight")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Sample length")
+    parser.add_argument("--windows", type=int, default=HEDGE_WINDOWS, help="Hedged windows per attempt")
+    parser.add_argument("--budget", type=int, default=10000, help="Requests per minute")
+    parser.add_argument("--latency", default="lognormal:1.0,0.5",
+                        help="fixed:S, uniform:LO,HI, normal:MEAN,STD, lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--script", help="Stand-in script to replay (overrides the options above)")
+    parser.add_argument("--audio", help="Audio to cut samples from (required with --script)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.script:
+        if not args.audio:
+            parser.error("--script needs --audio")
+        recognizer = StandInRecognizer.from_script(args.script, seed=args.seed)
+        track = load_audio_file(args.audio, SAMPLE_RATE)
+    else:
+        track = synthetic_track(120, rng)
+        response = {'track': {'title': 'Synthetic', 'subtitle': 'Benchmark'}}
+        reference = resample_poly(track, FINGERPRINT_SAMPLE_RATE, SAMPLE_RATE)
+        recognizer = StandInRecognizer([(reference, response, 0.0)], latency=args.latency,
+                                       error_rate=args.error_rate,
+                                       throttle_rate=args.throttle_rate, seed=args.seed)
+
+    identifier = SongIdentifier(recognizer=recognizer, budget=TokenBucket(args.budget, burst=args.budget))
+    identifier.backend("shazam").hedger.windows = args.windows
+    wall = time.perf_counter()
+    identified, latencies, offset_errors = asyncio.run(run(identifier, track, args, rng))
+    wall = time.perf_counter() - wall
+
+    stats = recognizer.stats()
+    print(f"{args.attempts} attempts, {args.seconds:g}s samples, concurrency {args.concurrency}, "
+          f"{wall:.1f}s wall")
+    print(f"identified   {identified / args.attempts:7.1%}")
+    print(f"errors       {stats['errors'] / max(1, stats['calls']):7.1%}")
+    print(f"throttled    {stats['throttled'] / max(1, stats['calls']):7.1%}")
+    print(f"latency p50  {percentile(latencies, 50):7.3f}s")
+    print(f"latency p95  {percentile(latencies, 95):7.3f}s")
+    print(f"latency max  {max(latencies, default=0.0):7.3f}s")
+    print(f"offset error {percentile(offset_errors, 50) * 1000:7.1f}ms median")
+    hedger = identifier.backend("shazam").hedger
+    print(f"requests     {hedger.submitted / args.attempts:7.2f} per attempt "
+          f"({hedger.cancelled} cancelled, {hedger.over_budget} over budget)")
+    breaker = identifier.backend("shazam").breaker
+    print(f"circuit      {breaker.state} ({breaker.opens} opens, {breaker.rejected} rejected)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Capture Thread Module
+
+Runs a blocking AudioSource on a dedicated thread and hands
+timestamped blocks to the asyncio loop through a bounded queue, so the
+loop never blocks on the audio device.
+"""
+
+import asyncio
+import collections
+import statistics
+import threading
+
+# What to do when the loop falls behind and the queue is full
+DROP_OLDEST = "drop_oldest"  # Keep the freshest audio (default)
+DROP_NEWEST = "drop_newest"  # Keep what is queued, discard the new block
+BLOCK = "block"  # Make the producer wait for room (non-real-time sources, e.g. file replay)
+
+
+class CaptureClosed(Exception):
+    """Raised by BlockQueue.get() once capture has stopped."""
+
+
+class BlockQueue:
+    """
+    Bounded thread-to-asyncio handoff for captured audio blocks.
+
+    Counters:
+        overruns: blocks discarded because the consumer fell behind
+        underruns: times the consumer waited longer than `stall_timeout`
+                   for a block (capture stalled)
+    """
+
+    def __init__(self, maxsize=32, policy=DROP_OLDEST, stall_timeout=1.0):
+        if policy not in (DROP_OLDEST, DROP_NEWEST, BLOCK):
+            raise ValueError(f"Unknown overrun policy: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.stall_timeout = stall_timeout
+        self.overruns = 0
+        self.underruns = 0
+
+        self._blocks = collections.deque()
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._loop = None
+        self._waiter = None
+        self._error = None
+        self._closed = False
+
+    def bind(self, loop):
+        """Attach the event loop that will consume blocks."""
+        self._loop = loop
+
+    def put(self, timestamp, frame_index, block):
+        """
+        Enqueue a block. Called from the capture thread; only waits (for
+        the consumer or close()) under the BLOCK policy.
+        """
+        with self._lock:
+            if self.policy == BLOCK:
+                while len(self._blocks) >= self.maxsize and not self._closed:
+                    self._not_full.wait()
+            if self._closed:
+                return
+            if len(self._blocks) >= self.maxsize:
+                self.overruns += 1
+                if self.policy == DROP_NEWEST:
+                    return
+                self._blocks.popleft()
+            self._blocks.append((timestamp, frame_index, block))
+            self._wake_locked()
+
+    def close(self, error=None):
+        """Signal end of capture; pending and future get() calls raise."""
+        with self._lock:
+            self._closed = True
+            self._error = error
+            self._not_full.notify_all()
+            self._wake_locked()
+
+    def _wake_locked(self):
+        waiter = self._waiter
+        if waiter is not None and self._loop is not None:
+            self._waiter = None
+            self._loop.call_soon_threadsafe(_resolve, waiter)
+
+    async def get(self):
+        """Wait for the next (timestamp, frame_index, block) tuple."""
+        while True:
+            with self._lock:
+                if self._blocks:
+                    self._not_full.notify()
+                    return self._blocks.popleft()
+                if self._closed:
+                    raise self._error or CaptureClosed()
+                waiter = self._loop.create_future()
+                self._waiter = waiter
+            try:
+                await asyncio.wait_for(waiter, self.stall_timeout)
+            except asyncio.TimeoutError:
+                with self._lock:
+                    self.underruns += 1
+                    if self._waiter is waiter:
+                        self._waiter = None
+
+    def qsize(self):
+        with self._lock:
+            return len(self._blocks)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class LatencyMeter:
+    """
+    Estimates how late blocks arrive relative to the audio they contain.
+
+    Two parts add up to the latency of a block's newest frame:
+    - device latency: what the audio device reports between sound playing
+      and the frames being delivered (None if the device can't tell)
+    - delivery lag: each block gives an implied stream origin
+      `arrival - frames / rate`; the earliest origin in the recent window
+      is taken as the on-time schedule (this also follows slow clock
+      drift), and the median lag behind it is the jitter on top
+    """
+
+    def __init__(self, sample_rate, block_size, window=10.0):
+        self.sample_rate = sample_rate
+        self.block_duration = block_size / sample_rate
+        size = max(8, int(window / self.block_duration))
+        self._origins = collections.deque(maxlen=size)
+        self._lags = collections.deque(maxlen=size)
+        self._device = collections.deque(maxlen=size)
+        self.delivery_lag = 0.0
+        self.device_latency = None
+
+    def update(self, frames_total, arrival, device_latency=None):
+        """Record a block ending at absolute frame `frames_total` that arrived at `arrival`."""
+        origin = arrival - frames_total / self.sample_rate
+        self._origins.append(origin)
+        self._lags.append(origin - min(self._origins))
+        self.delivery_lag = statistics.median(self._lags)
+        if device_latency is not None:
+            self._device.append(device_latency)
+            self.device_latency = statistics.median(self._device)
+
+    @property
+    def measured(self):
+        """True once the device has reported its latency."""
+        return self.device_latency is not None
+
+    @property
+    def latency(self):
+        """Seconds between a block's newest frame playing and the block arriving."""
+        return (self.device_latency or 0.0) + self.delivery_lag
+
+
+class CaptureThread(threading.Thread):
+    """Reads blocks from an AudioSource and feeds a BlockQueue."""
+
+    def __init__(self, source, queue):
+        super().__init__(name="audio-capture", daemon=True)
+        self.source = source
+        self.queue = queue
+        self.frames_captured = 0
+        self.latency_meter = LatencyMeter(source.sample_rate, source.block_size)
+        self._stop_event = threading.Event()
+
+    def run(self):
+        error = None
+        reconnects = 0
+        try:
+            with self.source:
+                while not self._stop_event.is_set():
+                    mono = self.source.read_block()
+                    if mono is None:
+                        break  # End of stream
+                    timestamp = self.source.clock()
+                    if self.source.reconnects != reconnects:
+                        # Count the outage as dropped frames so frame numbers keep
+                        # matching wall time (the timeline fills them with silence)
+                        reconnects = self.source.reconnects
+                        outage = self.source.last_reconnect_duration or 0.0
+                        self.frames_captured += int(outage * self.source.sample_rate)
+                    self.queue.put(timestamp, self.frames_captured, mono)
+                    self.frames_captured += len(mono)
+                    self.latency_meter.update(self.frames_captured, timestamp,
+                                              self.source.device_latency())
+        except Exception as e:
+            error = e
+        finally:
+            self.queue.close(error)
+
+    def stop(self, timeout=None):
+        """Ask the thread to finish after the current block and wait for it."""
+        self._stop_event.set()
+        self.source.interrupt()  # Ends a reconnect loop inside read_block()
+        self.queue.close()  # Releases a put() waiting for room
+        if self.is_alive():
+            self.join(timeout)
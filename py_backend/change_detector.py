@@ -0,0 +1,157 @@
+"""
+Track Change Detector Module
+
+Streaming detector for track boundaries in the captured audio.
+Compares rolling chroma (pitch-class) summaries of the most recent audio
+against the audio just before it, so a skip, crossfade or a gap between
+songs is noticed within seconds instead of at the next identification.
+"""
+
+import numpy as np
+
+# Change reasons
+GAP = "gap"  # Silence between tracks
+CUT = "cut"  # Abrupt switch (skip, playlist jump)
+CROSSFADE = "crossfade"  # Gradual blend into a different track
+
+# Detector settings
+FRAME_SIZE = 2048  # 128 ms at 16 kHz
+REFERENCE_DURATION = 8.0  # Seconds summarizing "the current track"
+CUT_DURATION = 1.0  # Recent audio compared for abrupt cuts
+FADE_DURATION = 4.0  # Recent audio compared for crossfades
+CUT_THRESHOLD = 0.35  # Chroma cosine distance
+FADE_THRESHOLD = 0.25
+GAP_RMS = 0.004  # Below this a frame counts as silent
+GAP_DURATION = 1.0  # Silence that separates two tracks
+COOLDOWN = 8.0  # Ignore further changes while a new reference builds up
+
+
+def _chroma_matrix(sample_rate, frame_size, fmin=55.0, fmax=5000.0):
+    """Map rfft bins to the 12 pitch classes."""
+    freqs = np.fft.rfftfreq(frame_size, 1.0 / sample_rate)
+    matrix = np.zeros((len(freqs), 12), dtype=np.float32)
+    band = (freqs >= fmin) & (freqs <= fmax)
+    pitch = np.round(12 * np.log2(freqs[band] / 440.0) + 69).astype(int) % 12
+    matrix[np.nonzero(band)[0], pitch] = 1.0
+    return matrix
+
+
+def _nearest_distance(reference, summary, span):
+    """
+    Smallest cosine distance between `summary` and the mean of any
+    `span`-frame stretch of `reference` (stepped by half a span).
+    """
+    step = max(1, span // 2)
+    starts = range(0, len(reference) - span + 1, step)
+    candidates = np.array([reference[s:s + span].mean(axis=0) for s in starts])
+    norms = np.linalg.norm(candidates, axis=1) * np.linalg.norm(summary)
+    if not norms.any():
+        return 0.0
+    similarity = candidates @ summary / np.where(norms > 0, norms, 1.0)
+    return float(1.0 - similarity.max())
+
+
+class TrackChangeDetector:
+    """
+    Detects track boundaries from a mono stream, block by block.
+
+    update() returns a reason (GAP, CUT or CROSSFADE) on the block where a
+    change is detected and None otherwise. `change_age` then holds how many
+    seconds before the end of that block the new track is estimated to begin.
+    """
+
+    def __init__(self, sample_rate, frame_size=FRAME_SIZE):
+        self.sample_rate = sample_rate
+        self.frame_size = frame_size
+        self.frame_duration = frame_size / sample_rate
+        self._chroma_map = _chroma_matrix(sample_rate, frame_size)
+        self._window = np.hanning(frame_size).astype(np.float32)
+
+        self._ref_frames = int(REFERENCE_DURATION / self.frame_duration)
+        self._cut_frames = max(1, int(CUT_DURATION / self.frame_duration))
+        self._fade_frames = int(FADE_DURATION / self.frame_duration)
+        self._gap_frames = int(GAP_DURATION / self.frame_duration)
+        self._cooldown_frames = int(COOLDOWN / self.frame_duration)
+        size = self._ref_frames + self._fade_frames
+        self._chroma = np.zeros((size, 12), dtype=np.float32)
+
+        self._carry = np.zeros(0, dtype=np.float32)
+        self.frames_seen = 0  # Analysis frames since start
+        self.change_age = 0.0
+        self._change_frames_ago = 0
+        self.reset()
+
+    def reset(self):
+        """Forget the current reference (e.g. after a detected change)."""
+        self._filled = 0
+        self._pos = 0
+        self._silent_run = 0
+        self._in_gap = False
+        self._cooldown = self._cooldown_frames
+
+    def update(self, block):
+        """Feed a block of samples; returns a change reason or None."""
+        data = np.concatenate((self._carry, block)) if len(self._carry) else np.asarray(block)
+        n_frames = len(data) // self.frame_size
+        self._carry = data[n_frames * self.frame_size:].copy()
+        if n_frames == 0:
+            return None
+
+        frames = data[:n_frames * self.frame_size].reshape(n_frames, self.frame_size)
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        spectra = np.abs(np.fft.rfft(frames * self._window, axis=1))
+        chroma = spectra @ self._chroma_map
+
+        reason = None
+        for i in range(n_frames):
+            changed = self._push(chroma[i], rms[i])
+            if changed:
+                reason = changed
+                frames_ago = self._change_frames_ago + (n_frames - 1 - i)
+                self.change_age = (frames_ago * self.frame_size + len(self._carry)) / self.sample_rate
+        return reason
+
+    def _push(self, chroma, rms):
+        self.frames_seen += 1
+        silent = rms < GAP_RMS
+
+        # Gaps: long silence followed by sound
+        if silent:
+            self._silent_run += 1
+            if self._silent_run >= self._gap_frames:
+                self._in_gap = True
+            return None  # Silence says nothing about which track is playing
+        self._silent_run = 0
+        if self._in_gap:
+            return self._changed(GAP, 1)
+
+        size = len(self._chroma)
+        self._chroma[self._pos] = chroma
+        self._pos = (self._pos + 1) % size
+        self._filled = min(self._filled + 1, size)
+        if self._cooldown > 0:
+            self._cooldown -= 1
+            return None
+        if self._filled < size:
+            return None
+
+        # Oldest-first order of the retained frames
+        order = (self._pos + np.arange(size)) % size
+        chroma_hist = self._chroma[order]
+        reference = chroma_hist[:self._ref_frames]
+
+        # Compare recent audio with its best match anywhere in the reference,
+        # so chord changes within the same song don't look like a new track
+        recent = chroma_hist[-self._cut_frames:].mean(axis=0)
+        if _nearest_distance(reference, recent, self._cut_frames) > CUT_THRESHOLD:
+            return self._changed(CUT, self._cut_frames)
+
+        faded = chroma_hist[-self._fade_frames:].mean(axis=0)
+        if _nearest_distance(reference, faded, self._fade_frames) > FADE_THRESHOLD:
+            return self._changed(CROSSFADE, self._fade_frames)
+        return None
+
+    def _changed(self, reason, frames_ago):
+        self.reset()
+        self._change_frames_ago = frames_ago
+        return reason
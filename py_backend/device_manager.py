@@ -0,0 +1,106 @@
+"""
+Device Manager Module
+
+Caches soundcard device enumeration and tracks which output sink is the
+default, so the loopback recorder can follow the sink when it changes
+(headphones plugged in, Bluetooth switch) instead of the app having to
+be restarted.
+"""
+
+import sys
+sys.argv = sys.argv or ['device_manager']  # Fix soundcard argv bug
+
+import time
+
+try:
+    import soundcard as sc
+except Exception:  # No PulseAudio server (CI, headless boxes)
+    sc = None
+
+ENUMERATION_TTL = 30.0  # Seconds a cached device list stays valid
+
+
+def _is_loopback(mic):
+    name = mic.name.lower()
+    return "monitor" in name or "loopback" in name
+
+
+class DeviceManager:
+    """
+    Cached view of the audio devices.
+
+    `all_microphones(include_loopback=True)` is slow, so the list is kept
+    for ENUMERATION_TTL seconds (or until refresh=True). The monitor of
+    the current default sink is preferred over any other loopback device.
+    """
+
+    def __init__(self, ttl=ENUMERATION_TTL):
+        self.ttl = ttl
+        self._mics = None
+        self._enumerated_at = 0.0
+        self.selected_sink = None  # Default sink id when the device was picked
+
+    def microphones(self, refresh=False):
+        """All capture devices including loopbacks (cached)."""
+        if sc is None:
+            return []
+        now = time.monotonic()
+        if refresh or self._mics is None or now - self._enumerated_at > self.ttl:
+            self._mics = sc.all_microphones(include_loopback=True)
+            self._enumerated_at = now
+        return self._mics
+
+    def default_sink(self):
+        """Id of the current default output sink, or None if unknown."""
+        if sc is None:
+            return None
+        try:
+            return sc.default_speaker().id
+        except Exception:
+            return None
+
+    def sink_changed(self):
+        """True if the default sink differs from the one the device was picked for."""
+        sink = self.default_sink()
+        return sink is not None and sink != self.selected_sink
+
+    def loopback_device(self, refresh=False, fallback=True):
+        """
+        Pick the loopback device to record from.
+        On Linux (PulseAudio), this is usually called "Monitor of..."
+
+        Args:
+            fallback: Use the default microphone if there is no loopback
+                device; without it a RuntimeError is raised instead
+        """
+        if sc is None:
+            raise RuntimeError("soundcard unavailable")
+        sink = self.default_sink()
+        mics = self.microphones(refresh)
+        loopbacks = [m for m in mics if _is_loopback(m)]
+        if sink is not None and not refresh and not any(sink in m.id for m in loopbacks):
+            # Sink appeared since the list was cached
+            mics = self.microphones(refresh=True)
+            loopbacks = [m for m in mics if _is_loopback(m)]
+
+        self.selected_sink = sink
+        for mic in loopbacks:
+            if sink is not None and sink in mic.id:
+                return mic
+        if loopbacks:
+            return loopbacks[0]
+        if not fallback:
+            raise RuntimeError("No loopback device available")
+        # Fallback to default
+        return sc.default_microphone()
+
+
+_shared = None
+
+
+def get_device_manager():
+    """Process-wide DeviceManager, so every caller shares one enumeration."""
+    global _shared
+    if _shared is None:
+        _shared = DeviceManager()
+    return _shared
@@ -0,0 +1,344 @@
+"""
+Fingerprint Module
+
+Offline landmark (constellation) fingerprinting against a local music
+library, so songs we own can be identified in milliseconds without a
+network round trip.
+
+Spectrogram peaks are paired into (f1, f2, dt) landmark hashes. The
+index keeps every landmark of every indexed track sorted by hash; a
+query looks its hashes up and votes on (track, time offset) pairs.
+
+Usage:
+    python fingerprint.py index ~/Music           # build/update the index
+    python fingerprint.py query clip.wav          # test a recording
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from math import gcd
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.ndimage import maximum_filter
+from scipy.signal import resample_poly
+
+from audio_source import load_audio_file
+
+# Fingerprint settings
+FINGERPRINT_SAMPLE_RATE = 8000
+N_FFT = 512  # 64 ms
+HOP = 128  # 16 ms per spectrogram frame
+PEAK_NEIGHBORHOOD = (15, 15)  # (frames, bins) a peak must dominate
+PEAK_THRESHOLD = 2.0  # Natural-log units above the frame median (~17 dB)
+PEAKS_PER_SECOND = 30
+FAN_OUT = 5  # Landmarks per anchor peak
+MAX_DT = 63  # Frames between paired peaks (6 bits)
+MIN_MATCHES = 10  # Aligned landmarks needed for a confident match
+MATCH_MARGIN = 2.0  # Best track must beat the runner-up by this factor
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".ogg", ".mp3")
+DEFAULT_INDEX_PATH = os.path.expanduser("~/.cache/lyrics-live/fingerprints.npz")
+
+_window = np.hanning(N_FFT).astype(np.float32)
+
+
+def _to_fingerprint_rate(audio, sample_rate):
+    if sample_rate == FINGERPRINT_SAMPLE_RATE:
+        return np.asarray(audio, dtype=np.float32)
+    g = gcd(int(sample_rate), FINGERPRINT_SAMPLE_RATE)
+    return resample_poly(audio, FINGERPRINT_SAMPLE_RATE // g, int(sample_rate) // g).astype(np.float32)
+
+
+def landmarks(audio, sample_rate=FINGERPRINT_SAMPLE_RATE):
+    """
+    Compute landmark hashes for mono audio.
+
+    Returns (hashes, times): uint32 arrays, `times` in spectrogram frames
+    (HOP / FINGERPRINT_SAMPLE_RATE seconds each) of the anchor peak.
+    """
+    audio = _to_fingerprint_rate(audio, sample_rate)
+    if len(audio) < N_FFT:
+        return np.zeros(0, dtype=np.uint32), np.zeros(0, dtype=np.uint32)
+
+    frames = sliding_window_view(audio, N_FFT)[::HOP]
+    spec = np.log(np.abs(np.fft.rfft(frames * _window, axis=1))[:, :256] + 1e-6)
+
+    # Constellation: local maxima well above their frame's noise floor, so
+    # background noise in a recording doesn't produce landmarks of its own
+    floor = np.median(spec, axis=1, keepdims=True)
+    is_peak = (maximum_filter(spec, size=PEAK_NEIGHBORHOOD) == spec) & (spec > floor + PEAK_THRESHOLD)
+    t, f = np.nonzero(is_peak)
+    budget = int(PEAKS_PER_SECOND * len(audio) / FINGERPRINT_SAMPLE_RATE) + 1
+    if len(t) > budget:
+        keep = np.sort(np.argsort(spec[t, f])[-budget:])
+        t, f = t[keep], f[keep]
+
+    # Pair each anchor with the next FAN_OUT peaks inside the target zone
+    hashes, times = [], []
+    for k in range(1, FAN_OUT + 1):
+        t1, f1, t2, f2 = t[:-k], f[:-k], t[k:], f[k:]
+        dt = t2 - t1
+        ok = (dt > 0) & (dt <= MAX_DT)
+        hashes.append((f1[ok] << 14) | (f2[ok] << 6) | dt[ok])
+        times.append(t1[ok])
+    return (np.concatenate(hashes).astype(np.uint32),
+            np.concatenate(times).astype(np.uint32))
+
+
+def track_landmarks(audio, sample_rate, offset=0.0):
+    """landmarks() of a partial recording, timed from the song start (offset in seconds)."""
+    h, t = landmarks(audio, sample_rate)
+    return h, t + np.uint32(round(max(0.0, offset) * FINGERPRINT_SAMPLE_RATE / HOP))
+
+
+def write_snapshot(path, snapshot):
+    """Write a FingerprintIndex.snapshot() atomically to `path`."""
+    hashes, track_ids, times, tracks = snapshot
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp.npz"
+    np.savez_compressed(tmp, hashes=hashes, track_ids=track_ids, times=times,
+                        tracks=np.array(tracks))
+    os.replace(tmp, path)
+
+
+def track_metadata(path):
+    """Title/artist from an 'Artist - Title.ext' file name (title only otherwise)."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if " - " in stem:
+        artist, title = stem.split(" - ", 1)
+        return title.strip(), artist.strip()
+    return stem, None
+
+
+class FingerprintIndex:
+    """
+    Landmark hash index of a local music library.
+
+    Stored as one .npz file: sorted `hashes` with parallel `track_ids`
+    and `times`, plus a JSON list of track metadata.
+    """
+
+    def __init__(self):
+        self.tracks = []  # [{'title', 'artist', 'duration', 'path', 'mtime'}]
+        self.hashes = np.zeros(0, dtype=np.uint32)
+        self.track_ids = np.zeros(0, dtype=np.uint32)
+        self.times = np.zeros(0, dtype=np.uint32)
+
+    def __len__(self):
+        return len(self.tracks)
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_PATH):
+        index = cls()
+        with np.load(path) as data:
+            index.tracks = json.loads(str(data["tracks"]))
+            index.hashes = data["hashes"]
+            index.track_ids = data["track_ids"]
+            index.times = data["times"]
+        return index
+
+    def save(self, path=DEFAULT_INDEX_PATH):
+        write_snapshot(path, self.snapshot())
+
+    def snapshot(self):
+        """
+        The index as it is now, for writing from another thread.
+
+        Arrays are only ever replaced, never modified in place, so they are
+        shared rather than copied; track metadata is serialized right away.
+        """
+        return self.hashes, self.track_ids, self.times, json.dumps(self.tracks)
+
+    def add_tracks(self, items):
+        """
+        Add tracks in one merge.
+
+        Args:
+            items: iterable of (metadata dict, mono audio at FINGERPRINT_SAMPLE_RATE)
+        """
+        hashes, track_ids, times = [self.hashes], [self.track_ids], [self.times]
+        for meta, audio in items:
+            h, t = landmarks(audio)
+            hashes.append(h)
+            times.append(t)
+            track_ids.append(np.full(len(h), len(self.tracks), dtype=np.uint32))
+            self.tracks.append(meta)
+
+        self._merge(hashes, track_ids, times)
+
+    def extend_track(self, track_id, audio, sample_rate, offset=0.0):
+        """
+        Add landmarks of a partial recording to an existing track.
+
+        Args:
+            offset: Song position (seconds) at the start of `audio`
+        """
+        self.insert_landmarks(track_id, *track_landmarks(audio, sample_rate, offset))
+
+    def insert_landmarks(self, track_id, hashes, times):
+        """
+        Merge landmarks of one track into the sorted index.
+
+        Only the new landmarks are sorted; they are inserted at their
+        searchsorted positions instead of re-sorting the whole index.
+        """
+        order = np.argsort(hashes, kind="stable")
+        hashes, times = hashes[order], times[order]
+        at = np.searchsorted(self.hashes, hashes, "right")
+        self.hashes = np.insert(self.hashes, at, hashes)
+        self.track_ids = np.insert(self.track_ids, at, np.uint32(track_id))
+        self.times = np.insert(self.times, at, times)
+
+    def _merge(self, hashes, track_ids, times):
+        hashes = np.concatenate(hashes)
+        order = np.argsort(hashes, kind="stable")
+        self.hashes = hashes[order]
+        self.track_ids = np.concatenate(track_ids)[order]
+        self.times = np.concatenate(times)[order]
+
+    def remove_paths(self, paths):
+        """Drop tracks whose 'path' is in `paths` (changed or deleted files)."""
+        self.remove_tracks([i for i, t in enumerate(self.tracks) if t.get('path') in paths])
+
+    def remove_tracks(self, track_ids):
+        """Drop tracks by position in `tracks`."""
+        drop = set(track_ids)
+        keep = [i for i in range(len(self.tracks)) if i not in drop]
+        if len(keep) == len(self.tracks):
+            return
+        remap = np.full(len(self.tracks), -1, dtype=np.int64)
+        remap[keep] = np.arange(len(keep))
+        new_ids = remap[self.track_ids]
+        mask = new_ids >= 0
+        self.hashes = self.hashes[mask]
+        self.times = self.times[mask]
+        self.track_ids = new_ids[mask].astype(np.uint32)
+        self.tracks = [self.tracks[i] for i in keep]
+
+    def match(self, audio, sample_rate):
+        """
+        Identify a recording against the index.
+
+        Returns the same shape as SongIdentifier.identify ('title',
+        'artist', 'offset' = song position at the start of `audio`) plus
+        'duration', 'score' and 'track_id', or None without a confident match.
+        """
+        if not len(self.hashes):
+            return None
+        q_hashes, q_times = landmarks(audio, sample_rate)
+        if not len(q_hashes):
+            return None
+
+        lo = np.searchsorted(self.hashes, q_hashes, "left")
+        hi = np.searchsorted(self.hashes, q_hashes, "right")
+        counts = hi - lo
+        if not counts.sum():
+            return None
+
+        # Expand every (query landmark, index entry) hit
+        q_idx = np.repeat(np.arange(len(q_hashes)), counts)
+        starts = np.repeat(lo - np.cumsum(counts) + counts, counts)
+        entry = starts + np.arange(len(q_idx))
+        tracks = self.track_ids[entry].astype(np.int64)
+        # Offset in 2-frame bins absorbs the +-1 frame jitter of peak positions
+        delta = (self.times[entry].astype(np.int64) - q_times[q_idx].astype(np.int64)) // 2
+
+        keys, votes = np.unique(tracks * (1 << 32) + (delta + (1 << 31)), return_counts=True)
+        best = int(np.argmax(votes))
+        best_track = int(keys[best] >> 32)
+        score = int(votes[best])
+
+        others = votes[(keys >> 32) != best_track]
+        runner_up = int(others.max()) if len(others) else 0
+        if score < MIN_MATCHES or score < MATCH_MARGIN * runner_up:
+            return None
+
+        best_delta = int(keys[best] & 0xFFFFFFFF) - (1 << 31)
+        meta = self.tracks[best_track]
+        return {
+            'track_id': best_track,
+            'title': meta['title'],
+            'artist': meta.get('artist'),
+            'offset': max(0.0, best_delta * 2 * HOP / FINGERPRINT_SAMPLE_RATE),
+            'duration': meta.get('duration'),
+            'score': score,
+        }
+
+
+def scan_library(root):
+    for dirpath, _, filenames in os.walk(root):
+        for name in sorted(filenames):
+            if name.lower().endswith(AUDIO_EXTENSIONS):
+                yield os.path.join(dirpath, name)
+
+
+def _under(path, root):
+    """True if `path` is `root` or inside it (not merely sharing a prefix)."""
+    try:
+        return os.path.commonpath((path, root)) == root
+    except ValueError:  # Different drives
+        return False
+
+
+def build_index(root, index_path=DEFAULT_INDEX_PATH):
+    """Index new or changed files under `root`, keeping existing entries."""
+    index = FingerprintIndex.load(index_path) if os.path.exists(index_path) else FingerprintIndex()
+    root = os.path.abspath(root)
+    present = {path: os.path.getmtime(path) for path in scan_library(root)}
+    stale = {t['path'] for t in index.tracks
+             if _under(t['path'], root) and present.get(t['path']) != t.get('mtime')}
+    index.remove_paths(stale)
+    known = {t['path'] for t in index.tracks}
+
+    def fresh_tracks():
+        for path, mtime in present.items():
+            if path in known:
+                continue
+            try:
+                audio = load_audio_file(path, FINGERPRINT_SAMPLE_RATE)
+            except Exception as e:
+                print(f"Skipping {path}: {e}")
+                continue
+            title, artist = track_metadata(path)
+            print(f"Indexed: {title}" + (f" - {artist}" if artist else ""))
+            yield {
+                'title': title,
+                'artist': artist,
+                'duration': len(audio) / FINGERPRINT_SAMPLE_RATE,
+                'path': path,
+                'mtime': mtime,
+            }, audio
+
+    before = len(index)
+    index.add_tracks(fresh_tracks())
+    index.save(index_path)
+    print(f"{len(index) - before} new tracks, {len(index)} total, "
+          f"{len(index.hashes)} landmarks -> {index_path}")
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fingerprint index")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="Index file")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("index", help="Scan a music directory").add_argument("directory")
+    sub.add_parser("query", help="Identify an audio file").add_argument("file")
+    args = parser.parse_args()
+
+    if args.command == "index":
+        build_index(args.directory, args.index)
+    else:
+        index = FingerprintIndex.load(args.index)
+        audio = load_audio_file(args.file, FINGERPRINT_SAMPLE_RATE)
+        start = time.perf_counter()
+        result = index.match(audio, FINGERPRINT_SAMPLE_RATE)
+        print(json.dumps(result), f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+        sys.exit(0 if result else 1)
+
+
+if __name__ == "__main__":
+    main()
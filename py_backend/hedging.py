@@ -0,0 +1,122 @@
+"""
+Hedging Module
+
+Hedged identification: instead of betting a whole interval on one sample,
+a few overlapping windows of the captured audio are submitted to the
+network recognizer concurrently. Identical answers count as votes; once
+one title has enough votes the remaining requests are cancelled. A
+request budget (rate_limit.TokenBucket) bounds how many windows may be sent.
+"""
+
+import asyncio
+import collections
+
+from rate_limit import TokenBucket
+
+HEDGE_WINDOWS = 3  # Overlapping windows per attempt (at most)
+HEDGE_STRIDE = 2.0  # Seconds between window starts
+CONFIDENT_VOTES = 2  # Agreeing windows that settle an attempt early
+
+
+def _vote_key(result):
+    return ((result.get('title') or '').casefold(), (result.get('artist') or '').casefold())
+
+
+class HedgedRecognizer:
+    """
+    Runs a recognizer on overlapping windows of one span of audio.
+
+    Args:
+        recognize: async fn(mono audio, sample rate) -> normalized result ('title',
+            'artist', 'offset' = song position at the window start) or None.
+            Should handle its own network errors.
+        budget: Anything with try_acquire()/available(), shared by everything
+            that calls the network (default: a rate_limit.TokenBucket)
+    """
+
+    def __init__(self, recognize, budget=None, windows=HEDGE_WINDOWS, stride=HEDGE_STRIDE,
+                 confident_votes=CONFIDENT_VOTES):
+        self.recognize = recognize
+        self.budget = budget or TokenBucket()
+        self.windows = windows
+        self.stride = stride
+        self.confident_votes = confident_votes
+
+        self.attempts = 0
+        self.submitted = 0
+        self.cancelled = 0
+        self.over_budget = 0  # Windows skipped because the budget was spent
+
+    def span_duration(self, sample_duration):
+        """Seconds of audio to hand to identify() for the full set of windows."""
+        return sample_duration + (self.windows - 1) * self.stride
+
+    def window_starts(self, span_frames, window_frames, sample_rate, max_windows=None):
+        """Window start frames, newest window first (it ends with the span)."""
+        stride = int(self.stride * sample_rate)
+        limit = min(self.windows, max_windows or self.windows)
+        starts = []
+        start = span_frames - window_frames
+        while start >= 0 and len(starts) < limit:
+            starts.append(start)
+            start -= stride
+        return starts
+
+    async def identify(self, span, sample_rate, sample_duration, max_windows=None):
+        """
+        Identify `span` from up to `max_windows` overlapping `sample_duration` windows.
+
+        Returns the winning result with 'offset' relative to the start of
+        `span` (median over the agreeing windows) and 'votes'/'windows'
+        counts, or None.
+        """
+        self.attempts += 1
+        window_frames = min(len(span), int(sample_duration * sample_rate))
+        starts = self.window_starts(len(span), window_frames, sample_rate, max_windows)
+        allowed = []
+        for start in starts:
+            if not self.budget.try_acquire():
+                self.over_budget += len(starts) - len(allowed)
+                break
+            allowed.append(start)
+        if not allowed:
+            return None
+        self.submitted += len(allowed)
+
+        async def window(start):
+            return start, await self.recognize(span[start:start + window_frames], sample_rate)
+
+        needed = min(self.confident_votes, len(allowed))
+        tasks = [asyncio.ensure_future(window(start)) for start in allowed]
+        votes = collections.defaultdict(list)  # key -> [(result, span offset)]
+        winner = None
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                start, result = await next_done
+                if not result:
+                    continue
+                key = _vote_key(result)
+                votes[key].append((result, result['offset'] - start / sample_rate))
+                if len(votes[key]) >= needed:
+                    winner = key
+                    break
+        finally:
+            pending = [t for t in tasks if not t.done()]
+            for task in pending:
+                task.cancel()
+            self.cancelled += len(pending)
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        if winner is None:
+            if not votes:
+                return None
+            winner = max(votes, key=lambda k: len(votes[k]))
+
+        agreeing = votes[winner]
+        offsets = sorted(offset for _, offset in agreeing)
+        result = dict(agreeing[0][0])
+        result['offset'] = offsets[len(offsets) // 2]
+        result['votes'] = len(agreeing)
+        result['windows'] = len(allowed)
+        return result
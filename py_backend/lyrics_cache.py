@@ -0,0 +1,218 @@
+"""
+Lyrics Cache Module
+
+Two-tier cache for LRCLIB lookups: an in-memory LRU of parsed lyrics in
+front of a SQLite store on disk, so songs played before never wait for
+the network. "No synced lyrics" answers are cached too, with a shorter
+TTL, so an instrumental doesn't cost a round trip on every play.
+
+Keys are the case-folded title, normalized artist, album and duration
+(rounded). Version suffixes stay in the title: Shazam results carry no
+duration, so "Song - Live at Wembley", "Song (Remastered 2011)" and
+"Song" must not share an entry.
+"""
+
+import collections
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from lyrics_match import normalize_artist
+
+LYRICS_CACHE_PATH = os.path.expanduser("~/.cache/lyrics-live/lyrics.sqlite3")
+MEMORY_ENTRIES = 256  # Parsed lyrics kept in memory
+MAX_DISK_BYTES = 64 * 1024 * 1024  # Least recently used entries are evicted beyond this
+FOUND_TTL = 30 * 24 * 3600.0  # Seconds before lyrics are fetched again
+MISSING_TTL = 24 * 3600.0  # Seconds a "no synced lyrics" answer is trusted
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lyrics (
+    key TEXT PRIMARY KEY,
+    payload TEXT,           -- LRCLIB record as JSON; NULL = no synced lyrics
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lyrics_last_used ON lyrics (last_used);
+"""
+
+
+def _normalize(text):
+    return " ".join(str(text).casefold().split()) if text else ""
+
+
+def cache_key(title, artist, album=None, duration=None):
+    """Normalized lookup key; durations are rounded to whole seconds."""
+    duration = str(int(round(float(duration)))) if duration else ""
+    return "\x1f".join((_normalize(title), normalize_artist(artist), _normalize(album), duration))
+
+
+class LyricsCache:
+    """
+    In-memory LRU over a SQLite store.
+
+    get() returns (found, record): found is False on a miss; record is the
+    LRCLIB dict (with parsed 'lines') or None for a cached "no lyrics".
+
+    Methods block on SQLite, so async callers run them in an executor;
+    a lock serializes them across threads.
+
+    Args:
+        path: SQLite file, or None for memory only
+        parse: fn(synced LRC text) -> lines, applied once when a record
+            enters the memory tier
+    """
+
+    def __init__(self, path=LYRICS_CACHE_PATH, parse=None, memory_entries=MEMORY_ENTRIES,
+                 max_disk_bytes=MAX_DISK_BYTES, found_ttl=FOUND_TTL, missing_ttl=MISSING_TTL,
+                 clock=time.time):
+        self.parse = parse
+        self.memory_entries = memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.found_ttl = found_ttl
+        self.missing_ttl = missing_ttl
+        self.clock = clock
+        self.memory = collections.OrderedDict()  # key -> (expires_at, record)
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.negative_hits = 0  # Hits on cached "no lyrics" (included above)
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self.db = None
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                self.db = sqlite3.connect(path, check_same_thread=False)
+                self.db.executescript(_SCHEMA)
+                self.db.execute("PRAGMA journal_mode=WAL")
+                self.db.execute("PRAGMA synchronous=NORMAL")
+            except sqlite3.Error as e:
+                print(json.dumps({"error": f"Lyrics cache unusable, keeping it in memory only: {e}"}),
+                      flush=True)
+                self.db = None
+
+    @property
+    def lookups(self):
+        return self.memory_hits + self.disk_hits + self.misses
+
+    @property
+    def hits(self):
+        return self.memory_hits + self.disk_hits
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def stats(self):
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'negative_hits': self.negative_hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+            'evictions': self.evictions,
+            'memory_entries': len(self.memory),
+        }
+
+    def _ttl(self, record):
+        return self.found_ttl if record else self.missing_ttl
+
+    def _remember(self, key, expires_at, record):
+        if record and self.parse and 'lines' not in record:
+            record = dict(record, lines=self.parse(record.get('syncedLyrics')))
+        self.memory[key] = (expires_at, record)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+        return record
+
+    def get(self, key):
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key):
+        now = self.clock()
+        entry = self.memory.get(key)
+        if entry is not None:
+            expires_at, record = entry
+            if expires_at > now:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                self.negative_hits += record is None
+                return True, record
+            del self.memory[key]
+
+        if self.db is not None:
+            row = self.db.execute("SELECT payload, stored_at FROM lyrics WHERE key = ?",
+                                  (key,)).fetchone()
+            if row is not None:
+                payload, stored_at = row
+                record = json.loads(payload) if payload is not None else None
+                expires_at = stored_at + self._ttl(record)
+                if expires_at > now:
+                    self.db.execute("UPDATE lyrics SET last_used = ? WHERE key = ?", (now, key))
+                    self.db.commit()
+                    self.disk_hits += 1
+                    self.negative_hits += record is None
+                    return True, self._remember(key, expires_at, record)
+                self.db.execute("DELETE FROM lyrics WHERE key = ?", (key,))
+                self.db.commit()
+
+        self.misses += 1
+        return False, None
+
+    def remember(self, key, record):
+        """Keep a record in the memory tier only (it has a home on disk elsewhere)."""
+        with self._lock:
+            return self._remember(key, self.clock() + self.found_ttl, record)
+
+    def put(self, key, record):
+        """Cache an LRCLIB record, or None for "no synced lyrics"; returns it as get() would."""
+        with self._lock:
+            return self._put(key, record)
+
+    def _put(self, key, record):
+        now = self.clock()
+        if record:
+            record = {k: v for k, v in record.items() if k != 'lines'}
+        cached = self._remember(key, now + self._ttl(record), record)
+        if self.db is None:
+            return cached
+        payload = json.dumps(record) if record else None
+        size = len(key) + (len(payload) if payload else 0)
+        self.db.execute("INSERT OR REPLACE INTO lyrics VALUES (?, ?, ?, ?, ?)",
+                        (key, payload, size, now, now))
+        self._evict()
+        self.db.commit()
+        return cached
+
+    def _evict(self):
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM lyrics").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        # Drop expired entries first, then the least recently used
+        now = self.clock()
+        expired = self.db.execute(
+            "DELETE FROM lyrics WHERE stored_at + CASE WHEN payload IS NULL THEN ? ELSE ? END <= ?",
+            (self.missing_ttl, self.found_ttl, now)).rowcount
+        self.evictions += max(0, expired)
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM lyrics").fetchone()[0]
+        for key, size in self.db.execute(
+                "SELECT key, size FROM lyrics ORDER BY last_used").fetchall():
+            if total <= self.max_disk_bytes:
+                break
+            self.db.execute("DELETE FROM lyrics WHERE key = ?", (key,))
+            self.memory.pop(key, None)
+            total -= size
+            self.evictions += 1
+
+    def close(self):
+        with self._lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
@@ -0,0 +1,237 @@
+"""
+Lyrics Database Module
+
+Local copy of the synced lyrics in an LRCLIB database dump, so lyrics
+are found in milliseconds and without a network connection. Only tracks
+with synced lyrics are kept, lyrics are zlib-compressed, and track and
+artist names get an FTS5 index for lookups that don't match exactly.
+
+Dumps (https://lrclib.net/db-dumps) are SQLite files, usually gzipped.
+Import streams them in batches, so memory stays bounded however large
+the dump is, and re-importing a newer dump only touches tracks updated
+since the previous import.
+
+Usage:
+    python lyrics_db.py import lrclib-db-dump.sqlite3.gz   # build/update
+    python lyrics_db.py query "Title" "Artist" [--duration 215]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+from lyrics_match import best_match, clean_title, primary_artist
+
+LYRICS_DB_PATH = os.path.expanduser("~/.cache/lyrics-live/lrclib.sqlite3")
+IMPORT_BATCH = 5000  # Dump rows read and written per transaction
+FTS_CANDIDATES = 20  # Full-text matches ranked per lookup
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    id INTEGER PRIMARY KEY,  -- LRCLIB track id
+    name TEXT NOT NULL,
+    artist_name TEXT NOT NULL,
+    album_name TEXT,
+    duration REAL,
+    name_key TEXT NOT NULL,
+    artist_key TEXT NOT NULL,
+    synced_lyrics BLOB NOT NULL  -- zlib-compressed LRC
+);
+CREATE INDEX IF NOT EXISTS tracks_key ON tracks (name_key, artist_key);
+CREATE VIRTUAL TABLE IF NOT EXISTS tracks_fts USING fts5(
+    name, artist_name, tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+# Latest lyrics of every track updated since the watermark
+_DUMP_QUERY = """
+SELECT t.id, t.name, t.artist_name, t.album_name, t.duration, l.synced_lyrics,
+       MAX(t.updated_at, COALESCE(l.updated_at, t.updated_at))
+FROM tracks t LEFT JOIN lyrics l ON l.id = t.last_lyrics_id
+WHERE t.updated_at > :since OR l.updated_at > :since
+ORDER BY t.id
+"""
+
+
+def name_key(text):
+    """Case- and whitespace-insensitive form used for exact lookups."""
+    return " ".join(str(text).casefold().split()) if text else ""
+
+
+def _tokens(text):
+    return re.findall(r"\w+", name_key(text))
+
+
+class LyricsDatabase:
+    """
+    Read side of the local lyrics database.
+
+    lookup() may be called from worker threads; access is serialized.
+    """
+
+    def __init__(self, path=LYRICS_DB_PATH):
+        self.path = path
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+
+    def __len__(self):
+        with self._lock:
+            return self.db.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+    def _exact(self, title, artist):
+        keys = {(name_key(title), name_key(artist)),
+                (name_key(clean_title(title)), name_key(primary_artist(artist)))}
+        rows = []
+        for key in keys:
+            rows += self.db.execute(
+                "SELECT id, name, artist_name, album_name, duration FROM tracks "
+                "WHERE name_key = ? AND artist_key = ?", key).fetchall()
+        return rows
+
+    def _search(self, title, artist):
+        title_tokens, artist_tokens = _tokens(clean_title(title)), _tokens(artist)
+        if not title_tokens:
+            return []
+        # Every title word, any artist word ("A feat. B" still finds "A")
+        query = " AND ".join(f'name : "{t}"' for t in title_tokens)
+        if artist_tokens:
+            query += " AND (" + " OR ".join(f'artist_name : "{t}"' for t in artist_tokens) + ")"
+        return self.db.execute(
+            "SELECT t.id, t.name, t.artist_name, t.album_name, t.duration "
+            "FROM tracks_fts JOIN tracks t ON t.id = tracks_fts.rowid "
+            "WHERE tracks_fts MATCH ? ORDER BY bm25(tracks_fts) LIMIT ?",
+            (query, FTS_CANDIDATES)).fetchall()
+
+    def lookup(self, title, artist, duration=None):
+        """
+        Synced lyrics for a song, as an LRCLIB-style record ('trackName',
+        'artistName', 'albumName', 'duration', 'syncedLyrics'), or None.
+
+        Exact and full-text candidates are ranked by lyrics_match.best_match
+        (title and artist similarity, closeness to `duration`).
+        """
+        with self._lock:
+            self.lookups += 1
+            rows = self._exact(title, artist) + self._search(title, artist)
+            candidates = {row[0]: row for row in rows}  # Exact matches also turn up in FTS
+            records = [{
+                'id': track_id,
+                'trackName': name,
+                'artistName': artist_name,
+                'albumName': album_name,
+                'duration': track_duration,
+            } for track_id, name, artist_name, album_name, track_duration in candidates.values()]
+            record = best_match(records, title, artist, duration)
+            if record is None:
+                return None
+            blob = self.db.execute("SELECT synced_lyrics FROM tracks WHERE id = ?",
+                                   (record['id'],)).fetchone()[0]
+            self.hits += 1
+        record['syncedLyrics'] = zlib.decompress(blob).decode("utf-8")
+        return record
+
+
+def _open_dump(dump_path, workdir):
+    """Path of the dump as a plain SQLite file, decompressing gzip in chunks if needed."""
+    with open(dump_path, "rb") as f:
+        gzipped = f.read(2) == b"\x1f\x8b"
+    if not gzipped:
+        return dump_path, None
+    fd, plain = tempfile.mkstemp(suffix=".sqlite3", dir=workdir)
+    with gzip.open(dump_path, "rb") as src, os.fdopen(fd, "wb") as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    return plain, plain
+
+
+def import_dump(dump_path, db_path=LYRICS_DB_PATH):
+    """Add or update tracks changed in `dump_path` since the previous import."""
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    db = sqlite3.connect(db_path)
+    db.executescript(_SCHEMA)
+    row = db.execute("SELECT value FROM meta WHERE key = 'dump_updated_at'").fetchone()
+    since = row[0] if row else ""
+
+    start = time.perf_counter()
+    plain, temporary = _open_dump(dump_path, os.path.dirname(db_path) or ".")
+    try:
+        dump = sqlite3.connect(f"file:{plain}?mode=ro", uri=True)
+        cursor = dump.execute(_DUMP_QUERY, {"since": since})
+        read = added = updated = removed = 0
+        watermark = since
+        while True:
+            rows = cursor.fetchmany(IMPORT_BATCH)
+            if not rows:
+                break
+            with db:  # One transaction per batch
+                for track_id, name, artist_name, album_name, duration, synced, updated_at in rows:
+                    watermark = max(watermark, updated_at or "")
+                    existed = db.execute("DELETE FROM tracks WHERE id = ?", (track_id,)).rowcount
+                    db.execute("DELETE FROM tracks_fts WHERE rowid = ?", (track_id,))
+                    if not synced or not name:
+                        removed += existed
+                        continue
+                    db.execute("INSERT INTO tracks VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                               (track_id, name, artist_name or "", album_name, duration,
+                                name_key(name), name_key(artist_name),
+                                zlib.compress(synced.encode("utf-8"))))
+                    db.execute("INSERT INTO tracks_fts (rowid, name, artist_name) VALUES (?, ?, ?)",
+                               (track_id, name, artist_name or ""))
+                    added += not existed
+                    updated += existed
+            read += len(rows)
+            print(f"{read} dump rows read, {added} new tracks so far...", flush=True)
+        dump.close()
+        with db:
+            db.execute("INSERT OR REPLACE INTO meta VALUES ('dump_updated_at', ?)", (watermark,))
+            db.execute("INSERT INTO tracks_fts (tracks_fts) VALUES ('optimize')")
+        total = db.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+    finally:
+        db.close()
+        if temporary:
+            os.remove(temporary)
+    print(f"{added} new tracks, {updated} updated, {removed} removed, {total} total -> {db_path} "
+          f"({time.perf_counter() - start:.0f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local LRCLIB lyrics database")
+    parser.add_argument("--db", default=LYRICS_DB_PATH, help="Database file")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("import", help="Import an LRCLIB dump (.sqlite3 or .sqlite3.gz)").add_argument("dump")
+    query = sub.add_parser("query", help="Look up a song")
+    query.add_argument("title")
+    query.add_argument("artist")
+    query.add_argument("--duration", type=float)
+    args = parser.parse_args()
+
+    if args.command == "import":
+        import_dump(args.dump, args.db)
+    else:
+        database = LyricsDatabase(args.db)
+        start = time.perf_counter()
+        result = database.lookup(args.title, args.artist, args.duration)
+        elapsed = (time.perf_counter() - start) * 1000
+        if result:
+            result['syncedLyrics'] = result['syncedLyrics'][:200]
+        print(json.dumps(result, ensure_ascii=False), f"({elapsed:.1f} ms)")
+        sys.exit(0 if result else 1)
+
+
+if __name__ == "__main__":
+    main()
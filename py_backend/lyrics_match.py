@@ -0,0 +1,120 @@
+"""
+Lyrics Match Module
+
+Normalizes song titles and artists as recognizers report them
+("Song (Remastered 2011)", "Song - Radio Edit", "A feat. B") and ranks
+lyrics candidates by trigram similarity of title and artist plus how
+close their duration is to the song's, so the version whose timing
+fits is picked rather than the first one with synced lyrics.
+"""
+
+import re
+import unicodedata
+
+# Bracketed or dash-separated title suffixes that name a version, not the song
+VERSION_WORDS = (
+    "remaster", "remastered", "feat", "ft", "featuring", "with", "live", "version",
+    "edit", "mix", "remix", "mono", "stereo", "deluxe", "bonus", "demo", "acoustic",
+    "explicit", "clean", "single", "album", "original", "instrumental", "from",
+)
+_VERSION = r"(?:\d{4}\s+)?(?:%s)\b" % "|".join(VERSION_WORDS)
+_BRACKETED = re.compile(r"\s*[(\[]\s*%s[^)\]]*[)\]]" % _VERSION, re.IGNORECASE)
+_DASH_SUFFIX = re.compile(r"\s+-\s+(?:\d{4}\s+)?%s.*$" % _VERSION, re.IGNORECASE)
+_FEATURING = re.compile(r"\s+(?:feat\.?|ft\.?|featuring|with)\s+.*$", re.IGNORECASE)
+_ARTIST_SEPARATORS = re.compile(r"\s*(?:,|;|&|\bx\b|\band\b|/)\s*", re.IGNORECASE)
+
+# Ranking
+TITLE_WEIGHT = 0.5
+LITERAL_TITLE_WEIGHT = 0.05  # Titles as given, suffixes kept: breaks ties between versions
+ARTIST_WEIGHT = 0.25
+DURATION_WEIGHT = 0.2
+DURATION_SCALE = 10.0  # Seconds of duration difference that cost the whole duration score
+MAX_DURATION_DIFF = 10.0  # Candidates further off than this are a different version
+MIN_TITLE_SIMILARITY = 0.5
+MIN_ARTIST_SIMILARITY = 0.3
+
+
+def _fold(text):
+    """Casefold, strip accents and punctuation, collapse whitespace."""
+    text = unicodedata.normalize("NFKD", str(text or ""))
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+
+def clean_title(title):
+    """Title without version suffixes: "Song (Remastered 2011)" -> "Song"."""
+    title = str(title or "")
+    cleaned = _DASH_SUFFIX.sub("", _BRACKETED.sub("", title)).strip()
+    return cleaned or title.strip()
+
+
+def without_featuring(artist):
+    """Artist credit without guests: "A feat. B" -> "A"; "A & B" stays."""
+    artist = str(artist or "").strip()
+    return _FEATURING.sub("", artist).strip() or artist
+
+
+def primary_artist(artist):
+    """First credited artist: "A feat. B" and "A, B & C" -> "A"."""
+    artist = without_featuring(artist)
+    return _ARTIST_SEPARATORS.split(artist)[0] or artist
+
+
+def normalize_title(title):
+    return _fold(clean_title(title))
+
+
+def normalize_artist(artist):
+    return _fold(artist)
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a, b):
+    """Trigram (Jaccard) similarity of two normalized strings, 0..1."""
+    if a == b:
+        return 1.0
+    ta, tb = trigrams(a), trigrams(b)
+    return len(ta & tb) / len(ta | tb) if ta and tb else 0.0
+
+
+def score(title, artist, duration, candidate_title, candidate_artist, candidate_duration):
+    """
+    Match score (higher is better), or None if the candidate is not the song.
+
+    Artists are compared in full and by their primary credit, so "A feat. B"
+    matches "A". Without both durations the duration term is neutral and the
+    literal title (version suffix included) decides between versions.
+    """
+    title_similarity = similarity(normalize_title(title), normalize_title(candidate_title))
+    if title_similarity < MIN_TITLE_SIMILARITY:
+        return None
+    artist_similarity = max(
+        similarity(normalize_artist(artist), normalize_artist(candidate_artist)),
+        similarity(normalize_artist(primary_artist(artist)),
+                   normalize_artist(primary_artist(candidate_artist))))
+    if artist and artist_similarity < MIN_ARTIST_SIMILARITY:
+        return None
+    duration_score = 0.5
+    if duration and candidate_duration:
+        difference = abs(float(candidate_duration) - float(duration))
+        if difference > MAX_DURATION_DIFF:
+            return None
+        duration_score = max(0.0, 1.0 - difference / DURATION_SCALE)
+    literal_similarity = similarity(_fold(title), _fold(candidate_title))
+    return (TITLE_WEIGHT * title_similarity + LITERAL_TITLE_WEIGHT * literal_similarity
+            + ARTIST_WEIGHT * artist_similarity + DURATION_WEIGHT * duration_score)
+
+
+def best_match(records, title, artist, duration=None):
+    """Best-scoring LRCLIB-style record ('trackName', 'artistName', 'duration'), or None."""
+    best, best_score = None, None
+    for record in records:
+        s = score(title, artist, duration, record.get("trackName"), record.get("artistName"),
+                  record.get("duration"))
+        if s is not None and (best_score is None or s > best_score):
+            best, best_score = record, s
+    return best
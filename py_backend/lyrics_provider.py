@@ -1,44 +1,218 @@
-import aiohttp
+import asyncio
+import collections
+import json
+import time
 import urllib.parse
 
+import aiohttp
+
+from lyrics_cache import cache_key
+from lyrics_match import best_match, clean_title, primary_artist, without_featuring
+
+# One pooled session for all LRCLIB requests
+CONNECT_TIMEOUT = 3.0  # Seconds to establish a connection (DNS, TCP, TLS)
+READ_TIMEOUT = 5.0  # Seconds without data from the server
+TOTAL_TIMEOUT = 10.0  # Seconds for a whole request
+DNS_CACHE_TTL = 300  # Seconds a resolved address is reused
+KEEPALIVE_TIMEOUT = 120.0  # Seconds an idle connection is kept open
+MAX_CONNECTIONS = 4
+
+# /get and /search run concurrently; a synced /search answer waits this
+# long for the more precise /get before it is used
+GET_GRACE = 0.3
+LOOKUP_HISTORY = 100  # Time-to-lyrics samples kept per path
+
+
+class ConnectionStats:
+    """Counts new vs reused connections through aiohttp trace hooks."""
+
+    def __init__(self):
+        self.requests = 0
+        self.new_connections = 0
+        self.reused_connections = 0
+        self.dns_lookups = 0
+        self.dns_cache_hits = 0
+
+    @property
+    def reuse_rate(self):
+        connections = self.new_connections + self.reused_connections
+        return self.reused_connections / connections if connections else 0.0
+
+    def trace_config(self):
+        trace = aiohttp.TraceConfig()
+
+        def counter(attribute):
+            async def count(session, context, params):
+                setattr(self, attribute, getattr(self, attribute) + 1)
+            return count
+
+        trace.on_request_start.append(counter("requests"))
+        trace.on_connection_create_end.append(counter("new_connections"))
+        trace.on_connection_reuseconn.append(counter("reused_connections"))
+        trace.on_dns_resolvehost_end.append(counter("dns_lookups"))
+        trace.on_dns_cache_hit.append(counter("dns_cache_hits"))
+        return trace
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'new_connections': self.new_connections,
+            'reused_connections': self.reused_connections,
+            'reuse_rate': self.reuse_rate,
+            'dns_lookups': self.dns_lookups,
+            'dns_cache_hits': self.dns_cache_hits,
+        }
+
+
+def _found(task):
+    """Whether a finished lookup task came back with synced lyrics."""
+    return task.done() and not task.cancelled() and task.exception() is None and bool(task.result())
+
+
 class LyricsProvider:
     BASE_URL = "https://lrclib.net/api"
 
+    def __init__(self, cache=None, database=None):
+        # lyrics_cache.LyricsCache, or None to always ask LRCLIB
+        self.cache = cache
+        # lyrics_db.LyricsDatabase (imported LRCLIB dump), asked before the network
+        self.database = database
+        if cache is not None and cache.parse is None:
+            cache.parse = self.parse_lrc
+        self.session = None  # Created by start(), closed by close()
+        self.connection_stats = ConnectionStats()
+        # Path that answered ("cache", "local", "get", "search", "none") -> recent seconds
+        self.lookup_times = collections.defaultdict(lambda: collections.deque(maxlen=LOOKUP_HISTORY))
+        self.last_lookup = None  # (path, seconds)
+        self.cancelled_requests = 0  # Losing requests cancelled
+
+    async def start(self):
+        """Open the pooled session (keep-alive, DNS cache, timeouts)."""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=MAX_CONNECTIONS, ttl_dns_cache=DNS_CACHE_TTL,
+                                             keepalive_timeout=KEEPALIVE_TIMEOUT)
+            timeout = aiohttp.ClientTimeout(total=TOTAL_TIMEOUT, connect=CONNECT_TIMEOUT,
+                                            sock_read=READ_TIMEOUT)
+            self.session = aiohttp.ClientSession(
+                connector=connector, timeout=timeout,
+                trace_configs=[self.connection_stats.trace_config()])
+        return self.session
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
     async def get_lyrics(self, title, artist, album=None, duration=None):
         """
-        Fetch synced lyrics from LRCLIB.
+        Fetch synced lyrics: from the cache, else the local LRCLIB database,
+        else the LRCLIB API.
         Returns a dictionary with 'syncedLyrics', 'plainLyrics', etc. or None.
+        Cached records also carry the parsed 'lines'.
+        """
+        start = time.perf_counter()
+        self.last_lookup = None
+        key = cache_key(title, artist, album, duration)
+        loop = asyncio.get_running_loop()
+        if self.cache is not None:
+            # SQLite off the event loop, so a slow disk can't stall sync
+            found, data = await loop.run_in_executor(None, self.cache.get, key)
+            if found:
+                self._lookup_done("cache", start)
+                return data
+
+        if self.database is not None:
+            try:
+                data = await loop.run_in_executor(None, self.database.lookup, title, artist, duration)
+            except Exception as e:
+                print(json.dumps({"error": f"Error reading local lyrics: {e}"}), flush=True)
+                data = None
+            if data:
+                self._lookup_done("local", start)
+                # Already on disk; only the memory tier is worth filling
+                if self.cache is not None:
+                    data = await loop.run_in_executor(None, self.cache.remember, key, data)
+                return data
+
+        try:
+            path, data = await self.fetch_lyrics(title, artist, album, duration)
+        except Exception as e:
+            print(json.dumps({"error": f"Error fetching lyrics: {e}"}), flush=True)
+            return None  # Not cached: the next play tries again
+
+        self._lookup_done(path, start)
+        if self.cache is not None:
+            data = await loop.run_in_executor(None, self.cache.put, key, data)
+        return data
+
+    def _lookup_done(self, path, start):
+        elapsed = time.perf_counter() - start
+        self.lookup_times[path].append(elapsed)
+        self.last_lookup = (path, elapsed)
+
+    async def fetch_lyrics(self, title, artist, album=None, duration=None):
+        """
+        Ask LRCLIB's /get (precise match) and /search concurrently, with
+        version suffixes and featured artists dropped from the query; search
+        results are ranked by lyrics_match.best_match.
+
+        Returns (path, record) with path "get", "search" or "none" (record
+        None: no synced lyrics). Network errors propagate when neither
+        request found lyrics.
         """
         params = {
-            "track_name": title,
-            "artist_name": artist,
+            "track_name": clean_title(title),
+            "artist_name": without_featuring(artist),
         }
         if album:
             params["album_name"] = album
         if duration:
-            params["duration"] = duration
+            params["duration"] = round(duration)
+        search_params = {"track_name": params["track_name"], "artist_name": primary_artist(artist)}
 
-        async with aiohttp.ClientSession() as session:
-            try:
-                # 1. Try 'get' endpoint (precise match)
-                async with session.get(f"{self.BASE_URL}/get", params=params) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        if data.get("syncedLyrics"):
-                            return data
-
-                # 2. Fallback to 'search' endpoint
-                async with session.get(f"{self.BASE_URL}/search", params=params) as resp:
-                    if resp.status == 200:
-                        results = await resp.json()
-                        # Return first result with synced lyrics
-                        for track in results:
-                            if track.get("syncedLyrics"):
-                                return track
-            except Exception as e:
-                print(f"Error fetching lyrics: {e}")
-        
-        return None
+        session = await self.start()  # No-op once started
+        lookups = {
+            "get": asyncio.ensure_future(self._get(session, params)),
+            "search": asyncio.ensure_future(
+                self._search(session, search_params, title, artist, duration)),
+        }
+        pending = set(lookups.values())
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                if lookups["get"] in pending and _found(lookups["search"]):
+                    # Give the precise match a moment before settling for search
+                    _, pending = await asyncio.wait(pending, timeout=GET_GRACE)
+                for path, task in lookups.items():
+                    if _found(task):
+                        return path, task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            self.cancelled_requests += len(pending)
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        for task in lookups.values():
+            if task.exception():
+                raise task.exception()  # Can't tell "no lyrics" apart from a failure
+        return "none", None
+
+    async def _get(self, session, params):
+        async with session.get(f"{self.BASE_URL}/get", params=params) as resp:
+            if resp.status == 404:
+                return None
+            resp.raise_for_status()
+            data = await resp.json()
+            return data if data.get("syncedLyrics") else None
+
+    async def _search(self, session, params, title, artist, duration):
+        async with session.get(f"{self.BASE_URL}/search", params=params) as resp:
+            resp.raise_for_status()
+            results = await resp.json()
+            # Best-matching result with synced lyrics, closest duration first
+            return best_match([track for track in results if track.get("syncedLyrics")],
+                              title, artist, duration)
 
     def parse_lrc(self, lrc_text):
         """
@@ -2,33 +2,82 @@ import sys
 sys.argv = sys.argv or ['main']  # Fix soundcard bug with empty argv
 import time
 import json
+import argparse
 import asyncio
-import tempfile
+import os
 import numpy as np
-import soundcard as sc
-import scipy.io.wavfile as wav
 from shazamio import Shazam
+from lyrics_cache import LYRICS_CACHE_PATH, LyricsCache
+from lyrics_db import LYRICS_DB_PATH, LyricsDatabase
 from lyrics_provider import LyricsProvider
+from song_identifier import SongIdentifier
+from fingerprint import DEFAULT_INDEX_PATH, FingerprintIndex
+from session_cache import SESSION_CACHE_PATH, SessionCache
+from reidentify_scheduler import ReidentifyScheduler
+from recognizer_standin import RecordingRecognizer, StandInRecognizer
+from rate_limit import OPEN, TokenBucket
+from resampler import ResamplingStage
+from music_detector import MUSIC, MusicDetector
+from change_detector import TrackChangeDetector
+from capture_thread import BLOCK, DROP_OLDEST, BlockQueue, CaptureClosed, CaptureThread
+from audio_source import DOWNMIX_STRATEGIES, FileReplaySource, LoopbackSource, get_loopback_device
 from faster_whisper import WhisperModel
 
 # Configuration
 SAMPLE_RATE = 44100 # Higher quality for music identification
-BLOCK_SIZE = 4096
+ANALYSIS_SAMPLE_RATE = 16000  # Rate Whisper and identification actually need
+CAPTURE_QUEUE_DURATION = 3.0  # Seconds of blocks queued; live capture drops the oldest if the loop falls behind
+DOWNMIX_STRATEGY = "mean"  # mean, left, right or mid
+
+# Capture latency profiles: frames per block
+# Small blocks = tighter sync and smoother position updates, more wakeups
+# Large blocks = least CPU
+LATENCY_PROFILES = {
+    "low": 1024,         # ~23 ms
+    "balanced": 4096,    # ~93 ms
+    "efficient": 16384,  # ~370 ms
+}
+LATENCY_PROFILE = "balanced"
 SHAZAM_SAMPLE_DURATION = 10  # 10 seconds for reliable Shazam identification
-SHAZAM_INTERVAL = 10.0  # Wait 10 seconds between Shazam attempts
+SHAZAM_INTERVAL = 10.0  # Re-identification interval after a change; backs off while sync agrees
+MAX_SHAZAM_INTERVAL = 80.0
+# Until a track is identified, try short samples first and stop at the first match
+PROGRESSIVE_SAMPLE_DURATIONS = (3, 5, SHAZAM_SAMPLE_DURATION)
+MUSIC_GATE_FRACTION = 0.5  # Only identify windows that are at least half music
+REQUEST_BUDGET_PER_MINUTE = 20  # Shazam requests, hedged windows included
+REQUEST_BURST = 6  # Requests that may go out back to back
 WHISPER_MODEL_SIZE = "tiny"
+WHISPER_BUFFER_DURATION = 30  # Max seconds of audio kept for transcription
+TIMELINE_DURATION = max(SHAZAM_SAMPLE_DURATION, WHISPER_BUFFER_DURATION)  # Shared audio history
 
 # Sync calibration settings
-# IMPORTANT: Adjust SYNC_OFFSET_CORRECTION to fix timing
+# Capture latency (device-reported plus delivery jitter) is measured at runtime.
+# Sources also carry a by-ear calibrated delay (2 s for loopback, 0 for file
+# replay); only the part the measured device latency doesn't explain is added.
+# SYNC_OFFSET_CORRECTION is a manual trim on top.
 # Positive = lyrics appear EARLIER, Negative = lyrics appear LATER
-SYNC_OFFSET_CORRECTION = 2.0  # Extra seconds to add to compensate for delays
+SYNC_OFFSET_CORRECTION = 0.0  # Extra seconds to add to compensate for delays
 CALIBRATION_SAMPLES = 5
 DRIFT_CORRECTION_RATE = 1.0  # Immediate correction
 
 class LyricsApp:
-    def __init__(self):
-        self.shazam = Shazam()
-        self.lyrics_provider = LyricsProvider()
+    def __init__(self, source=None, latency_profile=LATENCY_PROFILE, downmix=DOWNMIX_STRATEGY,
+                 fingerprint_index=None, session_cache=None, recognizer=None, lyrics_cache=None,
+                 lyrics_db=None):
+        self.source = source  # AudioSource; defaults to the loopback device
+        self.session_cache = session_cache  # Songs Shazam already identified
+        self.clock = time.monotonic  # Replaced by the source's clock in run()
+        self.latency_profile = latency_profile
+        self.block_size = LATENCY_PROFILES[latency_profile]
+        self.downmix = downmix
+        self.capture = None
+        self.reported_latency = None
+        # Local library, session cache and Shazam (or a stand-in) raced per attempt
+        self.identifier = SongIdentifier(fingerprint_index, session_cache, recognizer,
+                                         TokenBucket(REQUEST_BUDGET_PER_MINUTE, REQUEST_BURST))
+        self.reported_breaker_state = None
+        # Cache of earlier LRCLIB lookups and the local copy of an LRCLIB dump
+        self.lyrics_provider = LyricsProvider(lyrics_cache, lyrics_db)
         self.whisper_model = None
 
         self.current_song = None
@@ -36,11 +85,40 @@ class LyricsApp:
         self.lyrics_lines = []
         self.is_playing_lrc = False
 
-        self.last_shazam_time = 0
-        self.audio_buffer = np.array([], dtype=np.float32)
-
-        # Whisper buffer
-        self.whisper_buffer = np.array([], dtype=np.float32)
+        # When to re-identify the current track; counts calls per track
+        self.scheduler = ReidentifyScheduler(SHAZAM_INTERVAL, MAX_SHAZAM_INTERVAL)
+        self.track_duration = None  # Seconds, from identification or LRCLIB metadata
+        self.blocks = None
+
+        # Background work: at most one identification attempt and one lyrics
+        # fetch in flight. The generation changes whenever sync state is reset,
+        # so results that arrive for an outdated track are dropped.
+        self.identify_task = None
+        self.lyrics_task = None
+        self.sync_generation = 0
+        self.reported_capture_health = (0, 0)
+        self.reported_reconnects = 0
+
+        # Shared audio history; each consumer reads through its own cursor.
+        # Analyzers read the 16 kHz stream, resampled once per block.
+        self.resampling = ResamplingStage(SAMPLE_RATE, [ANALYSIS_SAMPLE_RATE], TIMELINE_DURATION)
+        self.analysis_timeline = self.resampling.timeline(ANALYSIS_SAMPLE_RATE)
+        self.shazam_cursor = self.analysis_timeline.cursor()
+
+        # Whisper cursor
+        self.whisper_cursor = self.analysis_timeline.cursor()
+
+        # Streaming silence/speech/music classifier gating identification
+        self.music_detector = MusicDetector(ANALYSIS_SAMPLE_RATE)
+        self.detector_cursor = self.analysis_timeline.cursor()
+        self.reported_audio_state = None
+
+        # Track boundary detection; a change triggers immediate re-identification
+        self.change_detector = TrackChangeDetector(ANALYSIS_SAMPLE_RATE)
+        self.sample_duration = PROGRESSIVE_SAMPLE_DURATIONS[0]  # Length of the next identification sample
+        self.sample_step = 0  # Position in PROGRESSIVE_SAMPLE_DURATIONS while searching
+        self.search_started_at = None  # When the unidentified track started, for time-to-lyrics
+        self.track_start_frame = 0  # Analysis frame where the current track began (if known)
         self.last_transcription_time = 0
 
         # Sync calibration - stores recent offset measurements
@@ -56,83 +134,110 @@ class LyricsApp:
             except Exception as e:
                 print(json.dumps({"error": f"Whisper load failed: {e}"}), flush=True)
 
-    async def identify_song(self, audio_chunk):
-        # Shazam expects bytes (WAV/PCM) or file path.
-        # We need to convert float32 numpy array to int16 bytes.
-        audio_int16 = (audio_chunk * 32767).astype(np.int16)
-
-        # Check if audio has actual content (not silence)
-        audio_level = np.abs(audio_int16).mean()
-        print(json.dumps({"status": f"Audio level: {audio_level:.0f}"}), flush=True)
-
-        if audio_level < 100:
-            print(json.dumps({"status": "Audio too quiet - is music playing?"}), flush=True)
-            return None
-
-        tmp_path = None
-        try:
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-                tmp_path = tmp.name
-                wav.write(tmp_path, SAMPLE_RATE, audio_int16)
+    async def identify_song(self, audio_chunk, sample_duration=None):
+        """
+        Identify a sample with the fastest confident recognizer backend.
 
-            out = await self.shazam.recognize(tmp_path)
-            return out
-        except Exception as e:
-            print(json.dumps({"error": f"Shazam error: {e}"}), flush=True)
-            return None
-        finally:
-            # Clean up temp file
-            if tmp_path:
-                try:
-                    import os
-                    os.unlink(tmp_path)
-                except:
-                    pass
+        The result's offset is the song position at the start of `audio_chunk`.
+        """
+        result = await self.identifier.identify(audio_chunk, ANALYSIS_SAMPLE_RATE, sample_duration)
+        self.report_session_cache()
+        self.report_hedging(result)
+        self.report_backends()
+        self.report_network_guard()
+        return result
+
+    def identification_span(self, sample_duration):
+        """
+        Newest audio for an attempt: room for every hedged window, but never
+        reaching back before the current track began.
+        """
+        frames = int(ANALYSIS_SAMPLE_RATE * self.identifier.span_duration(sample_duration))
+        start = max(self.analysis_timeline.end_frame - frames, self.track_start_frame)
+        return np.array(self.analysis_timeline.view(start))
 
     async def run(self):
         print(json.dumps({"status": "Starting Hybrid Backend..."}), flush=True)
         
         # Audio Setup
-        mic = self.get_loopback_mic()
-        if not mic:
-            return
+        queue_blocks = max(4, int(CAPTURE_QUEUE_DURATION * SAMPLE_RATE / self.block_size))
+        if not self.source:
+            mic = self.get_loopback_mic()
+            if not mic:
+                return
+            self.source = LoopbackSource(SAMPLE_RATE, self.block_size, device=mic,
+                                         downmix=self.downmix,
+                                         pool_size=queue_blocks + 2)
+        else:
+            print(json.dumps({"status": f"Audio source: {self.source.name}"}), flush=True)
+        self.clock = self.source.clock
+        await self.lyrics_provider.start()
+
+        # Capture runs on its own thread; the loop only awaits finished blocks.
+        # Live audio drops stale blocks, replay waits so every block is processed.
+        self.blocks = BlockQueue(queue_blocks, DROP_OLDEST if self.source.realtime else BLOCK)
+        self.blocks.bind(asyncio.get_running_loop())
+        capture = self.capture = CaptureThread(self.source, self.blocks)
+        capture.start()
 
         # Main Loop
-        with mic.recorder(samplerate=SAMPLE_RATE) as recorder:
+        try:
             while True:
-                # 1. Record Audio
-                data = recorder.record(numframes=BLOCK_SIZE)
-                mono_data = data.mean(axis=1)
-                
-                # Update buffers
-                self.audio_buffer = np.concatenate((self.audio_buffer, mono_data))
-                self.whisper_buffer = np.concatenate((self.whisper_buffer, mono_data))
-                
-                current_time = time.time()
-
-                # 2. Try Identification (if buffer big enough and interval passed)
-                if len(self.audio_buffer) > SAMPLE_RATE * SHAZAM_SAMPLE_DURATION:
-                    if current_time - self.last_shazam_time > SHAZAM_INTERVAL:
-                        self.last_shazam_time = current_time
-
-                        # Record the exact moment the sample ends (NOW)
-                        sample_end_time = time.time()
+                # 1. Wait for the next captured block
+                block_time, frame_index, mono_data = await self.blocks.get()
+                if self.search_started_at is None and self.current_song is None:
+                    self.search_started_at = block_time - len(mono_data) / SAMPLE_RATE
+
+                # Update the shared timeline
+                self.resampling.write(mono_data, block_time, frame_index)
+
+                current_time = self.clock()
+                self.report_capture_health()
+                self.report_capture_latency()
+                self.report_reconnects()
+
+                # Classify the new audio (silence / speech / music) and watch for track changes
+                new_audio = self.detector_cursor.read()
+                self.music_detector.update(new_audio)
+                self.report_audio_state()
+                change = self.change_detector.update(new_audio)
+                if change:
+                    self.handle_track_change(change, self.change_detector.change_age)
+
+                # 2. Try Identification (if buffer big enough, interval passed, it's music
+                #    and no attempt is already in flight). While searching for a new
+                #    track, each longer progressive sample is tried as soon as it is in.
+                sample_duration = self.sample_duration
+                progressive = self.sample_step < len(PROGRESSIVE_SAMPLE_DURATIONS)
+                idle = self.identify_task is None or self.identify_task.done()
+                if idle and self.shazam_cursor.available() >= ANALYSIS_SAMPLE_RATE * sample_duration:
+                    is_music = (self.music_detector.fraction(MUSIC, sample_duration)
+                                >= MUSIC_GATE_FRACTION)
+                    due = progressive or self.scheduler.due(current_time)
+                    if is_music and due:
+                        self.scheduler.attempted(current_time)
+
+                        # The sample ends with the newest resampled frame
+                        sample_end_time = self.analysis_timeline.end_time
 
                         # Run identification in background
-                        # We take the last N seconds
-                        chunk = self.audio_buffer[-SAMPLE_RATE*SHAZAM_SAMPLE_DURATION:]
-
-                        # Reset buffer to avoid growing forever
-                        self.audio_buffer = np.array([], dtype=np.float32)
+                        # We take the last N seconds, plus room for overlapping hedge windows
+                        # (copied: the timeline keeps moving)
+                        chunk = self.identification_span(sample_duration)
 
-                        print(json.dumps({"status": f"Identifying song ({SHAZAM_SAMPLE_DURATION}s sample)..."}), flush=True)
+                        if progressive and self.sample_step + 1 < len(PROGRESSIVE_SAMPLE_DURATIONS):
+                            # Keep the cursor: the next, longer sample extends this one
+                            self.sample_step += 1
+                            self.sample_duration = PROGRESSIVE_SAMPLE_DURATIONS[self.sample_step]
+                        else:
+                            # Start collecting a fresh sample for the next attempt
+                            self.end_progressive_search()
 
-                        # Time the Shazam API call
-                        shazam_start = time.time()
-                        result = await self.identify_song(chunk)
-                        shazam_duration = time.time() - shazam_start
+                        print(json.dumps({"status": f"Identifying song ({sample_duration}s sample)..."}), flush=True)
 
-                        await self.handle_shazam_result(result, sample_end_time, shazam_duration)
+                        self.identify_task = self.spawn(
+                            self.identification_attempt(chunk, sample_end_time, sample_duration),
+                            "identify")
 
                 # 3. Broadcast State
                 if self.is_playing_lrc:
@@ -147,45 +252,346 @@ class LyricsApp:
                 # else:
                 #     self.load_whisper()
                 #     await self.process_whisper(current_time)
+        except CaptureClosed:
+            print(json.dumps({"status": "Audio source ended"}), flush=True)
+        finally:
+            self.cancel_background_tasks()
+            capture.stop(timeout=1.0)
+            await self.lyrics_provider.close()
+
+    def spawn(self, coro, name):
+        """Start a supervised background task whose failures are reported, not lost."""
+        task = asyncio.create_task(coro, name=name)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task):
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error:
+            print(json.dumps({"error": f"{task.get_name()} task failed: {error}"}), flush=True)
+
+    def cancel_background_tasks(self):
+        for task in (self.identify_task, self.lyrics_task):
+            if task and not task.done():
+                task.cancel()
+
+    async def identification_attempt(self, chunk, sample_end_time, sample_duration):
+        """Identify one sample in the background and apply the result to sync state."""
+        generation = self.sync_generation
+
+        # Time the Shazam API call
+        shazam_start = self.clock()
+        result = await self.identify_song(chunk, sample_duration)
+        shazam_duration = self.clock() - shazam_start
+
+        if generation != self.sync_generation:
+            print(json.dumps({"status": "Discarding identification for previous track"}), flush=True)
+            return
+        # Offsets refer to the start of the whole (hedged) chunk
+        self.handle_shazam_result(result, sample_end_time, shazam_duration,
+                                  len(chunk) / ANALYSIS_SAMPLE_RATE)
+
+    async def fetch_lyrics(self, title, artist, duration=None):
+        """Fetch lyrics in the background; applied only if the song is still current."""
+        generation = self.sync_generation
+        print(json.dumps({"status": f"Fetching lyrics for {title}..."}), flush=True)
+        lyrics_data = await self.lyrics_provider.get_lyrics(title, artist, duration=duration)
+        self.report_lyrics_cache()
+        self.report_lyrics_connections()
+
+        if generation != self.sync_generation or self.current_song != title:
+            return  # Track changed while the request was in flight
+
+        if lyrics_data and lyrics_data.get('syncedLyrics'):
+            self.report_lyrics_lookup("Lyrics found")
+            self.report_time_to("lyrics")
+            self.search_started_at = None
+            self.lyrics_lines = (lyrics_data.get('lines')
+                                 or self.lyrics_provider.parse_lrc(lyrics_data['syncedLyrics']))
+            if not self.track_duration and lyrics_data.get('duration'):
+                self.track_duration = float(lyrics_data['duration'])
+                self.update_expected_end()
+            self.is_playing_lrc = True
+
+            # Send full lyrics to frontend once
+            print(json.dumps({
+                "type": "lyrics_load",
+                "lines": self.lyrics_lines,
+                "track": title,
+                "artist": artist
+            }), flush=True)
+        else:
+            self.report_lyrics_lookup("No synced lyrics found. Using Whisper.")
+            self.search_started_at = None
+            self.is_playing_lrc = False
+
+    def report_audio_state(self):
+        """Emit the detector state (silence/speech/music) when it changes."""
+        state = self.music_detector.state
+        if state != self.reported_audio_state:
+            self.reported_audio_state = state
+            print(json.dumps({
+                "type": "audio_state",
+                "state": state,
+                "level_db": round(self.music_detector.level_db(), 1),
+                "status": f"Audio: {state}"
+            }), flush=True)
+
+    def report_capture_latency(self):
+        """Emit the measured capture latency when it moves by more than 5 ms."""
+        meter = self.capture.latency_meter
+        if self.reported_latency is None or abs(meter.latency - self.reported_latency) > 0.005:
+            self.reported_latency = meter.latency
+            print(json.dumps({
+                "status": f"Capture latency: profile={self.latency_profile} "
+                          f"block={meter.block_duration * 1000:.0f}ms "
+                          f"measured={meter.latency * 1000:.1f}ms"
+                          + ("" if meter.measured else " (device latency unknown)"),
+                "capture_latency": meter.latency,
+                "block_duration": meter.block_duration
+            }), flush=True)
+
+    def report_reconnects(self):
+        """Emit a status line after the source reopened its device."""
+        if self.source.reconnects != self.reported_reconnects:
+            self.reported_reconnects = self.source.reconnects
+            duration = self.source.last_reconnect_duration or 0.0
+            print(json.dumps({
+                "status": f"Audio device reconnected: {self.source.name} in {duration * 1000:.0f}ms",
+                "reconnects": self.source.reconnects,
+                "reconnect_time": duration
+            }), flush=True)
+
+    def report_session_cache(self):
+        """Emit session cache effectiveness after each lookup."""
+        cache = self.session_cache
+        if cache is None or not cache.lookups:
+            return
+        print(json.dumps({
+            "status": f"Session cache: {cache.hits}/{cache.lookups} hits "
+                      f"({cache.hit_rate:.0%}), {cache.network_calls_avoided} network calls avoided",
+            "cache_hit_rate": cache.hit_rate,
+            "network_calls_avoided": cache.network_calls_avoided
+        }), flush=True)
+
+    def report_lyrics_cache(self):
+        """Emit lyrics cache effectiveness after each lookup."""
+        cache = self.lyrics_provider.cache
+        if cache is None or not cache.lookups:
+            return
+        print(json.dumps({
+            "status": f"Lyrics cache: {cache.hits}/{cache.lookups} hits ({cache.hit_rate:.0%}; "
+                      f"{cache.memory_hits} memory, {cache.disk_hits} disk, "
+                      f"{cache.negative_hits} known without lyrics)",
+            "lyrics_cache_hit_rate": cache.hit_rate,
+            "lyrics_cache_misses": cache.misses
+        }), flush=True)
+
+    def report_lyrics_lookup(self, status):
+        """Emit which lookup path answered and how long it took."""
+        provider = self.lyrics_provider
+        message = {"status": status}
+        if provider.last_lookup:
+            path, elapsed = provider.last_lookup
+            times = provider.lookup_times[path]
+            message["status"] += f" ({path} in {elapsed * 1000:.0f} ms)"
+            message["lyrics_path"] = path
+            message["time_to_lyrics_ms"] = round(elapsed * 1000, 1)
+            message["median_time_to_lyrics_ms"] = round(sorted(times)[len(times) // 2] * 1000, 1)
+        print(json.dumps(message), flush=True)
+
+    def report_lyrics_connections(self):
+        """Emit how many LRCLIB requests reused a pooled connection."""
+        stats = self.lyrics_provider.connection_stats
+        if not stats.requests:
+            return
+        print(json.dumps({
+            "status": f"LRCLIB connections: {stats.new_connections} opened, "
+                      f"{stats.reused_connections} reused ({stats.reuse_rate:.0%}) "
+                      f"over {stats.requests} requests",
+            "connection_reuse_rate": stats.reuse_rate,
+            "connections_opened": stats.new_connections
+        }), flush=True)
+
+    def report_hedging(self, result):
+        """Emit how a hedged attempt was decided and what hedging cost overall."""
+        hedger = self.identifier.backend("shazam").hedger
+        if result and 'votes' in result:
+            status = f"Hedged identification: {result['votes']}/{result['windows']} windows agree"
+        elif hedger.budget.available() == 0:
+            status = "Request budget spent - waiting before asking Shazam again"
+        else:
+            return
+        print(json.dumps({
+            "status": status,
+            "hedge_requests": hedger.submitted,
+            "hedge_cancelled": hedger.cancelled,
+            "hedge_over_budget": hedger.over_budget
+        }), flush=True)
+
+    def report_backends(self):
+        """Emit per-backend hit rate and latency after each attempt."""
+        stats = self.identifier.stats
+        summary = ", ".join(f"{name} {s.hits}/{s.calls} ({s.median_latency * 1000:.0f}ms)"
+                            for name, s in stats.items() if s.calls)
+        if not summary:
+            return
+        print(json.dumps({
+            "status": f"Recognizers: {summary}",
+            "backends": {name: s.as_dict() for name, s in stats.items()}
+        }), flush=True)
+
+    def report_network_guard(self):
+        """Emit the Shazam circuit breaker state when it changes."""
+        shazam = self.identifier.backend("shazam")
+        breaker = shazam.breaker
+        state = breaker.state
+        if state == self.reported_breaker_state:
+            return
+        self.reported_breaker_state = state
+        status = f"Shazam circuit {state}"
+        if state == OPEN:
+            status += f" - using local recognizers, retry in {breaker.retry_in:.0f}s"
+        print(json.dumps({
+            "status": status,
+            "breaker_state": state,
+            "breaker_opens": breaker.opens,
+            "breaker_rejected": breaker.rejected,
+            "rate_limited": shazam.budget.rejected
+        }), flush=True)
+
+    def report_capture_health(self):
+        """Emit a status line whenever the capture queue drops or stalls."""
+        overruns, underruns = self.blocks.overruns, self.blocks.underruns
+        if (overruns, underruns) != self.reported_capture_health:
+            self.reported_capture_health = (overruns, underruns)
+            print(json.dumps({
+                "status": f"Capture: overruns={overruns} underruns={underruns}",
+                "capture_overruns": overruns,
+                "capture_underruns": underruns
+            }), flush=True)
+
+    def start_progressive_search(self, started_at):
+        """Identify the next track from the shortest progressive sample up."""
+        self.sample_step = 0
+        self.sample_duration = PROGRESSIVE_SAMPLE_DURATIONS[0]
+        self.search_started_at = started_at
+
+    def end_progressive_search(self):
+        """Fall back to full-length samples at SHAZAM_INTERVAL."""
+        self.sample_step = len(PROGRESSIVE_SAMPLE_DURATIONS)
+        self.sample_duration = SHAZAM_SAMPLE_DURATION
+        self.shazam_cursor.seek_to_end()
+
+    def report_time_to(self, what, sample_duration=None):
+        """Emit seconds from the start of the current track until `what` happened."""
+        if self.search_started_at is None:
+            return
+        elapsed = self.clock() - self.search_started_at
+        message = {
+            "status": f"Time to {what}: {elapsed:.1f}s"
+                      + (f" ({sample_duration:.1f}s sample)" if sample_duration else ""),
+            f"time_to_{what}": elapsed
+        }
+        if sample_duration:
+            message["sample_duration"] = round(sample_duration, 2)
+        print(json.dumps(message), flush=True)
+
+    def update_expected_end(self):
+        """Let the scheduler probe just before the current track should end."""
+        if self.current_song and self.track_duration:
+            self.scheduler.set_expected_end(self.song_start_time + self.track_duration)
+
+    def report_calls_per_track(self, finished):
+        """Emit how many identification calls a finished track needed."""
+        if finished is None:
+            return
+        title, calls = finished
+        print(json.dumps({
+            "status": f"Identification calls for {title or 'unidentified track'}: {calls} "
+                      f"(average {self.scheduler.average_calls:.1f} per track)",
+            "calls_per_track": calls,
+            "average_calls_per_track": self.scheduler.average_calls
+        }), flush=True)
+
+    def handle_track_change(self, reason, age):
+        """
+        Drop sync state for the old track and identify the new one right away.
 
-                await asyncio.sleep(0.01)
-
-    async def handle_shazam_result(self, result, sample_end_time, shazam_duration):
+        Args:
+            reason: Change detector reason (gap, cut or crossfade)
+            age: Seconds since the new track is estimated to have started
+        """
+        self.current_song = None
+        self.lyrics_lines = []
+        self.is_playing_lrc = False
+        self.offset_history = []
+        self.sync_drift = 0
+        self.sync_generation += 1
+        self.cancel_background_tasks()
+
+        # Identify from audio of the new track only, as soon as a short sample is in
+        boundary = self.analysis_timeline.end_frame - int(age * ANALYSIS_SAMPLE_RATE)
+        self.shazam_cursor.position = max(boundary, self.analysis_timeline.start_frame)
+        self.track_start_frame = self.shazam_cursor.position
+        self.start_progressive_search(self.clock() - age)
+        self.track_duration = None
+        self.report_calls_per_track(self.scheduler.boundary(self.clock()))
+
+        print(json.dumps({
+            "type": "track_change",
+            "reason": reason,
+            "status": f"Track change detected ({reason}) - re-identifying"
+        }), flush=True)
+
+    def handle_shazam_result(self, result, sample_end_time, shazam_duration,
+                             sample_duration=SHAZAM_SAMPLE_DURATION):
         """
-        Handle Shazam result with precise timing calibration.
+        Handle an identification result with precise timing calibration.
+
+        Runs without awaiting, so sync state is updated atomically with
+        respect to the main loop; lyrics for a new song are fetched by a
+        background task.
 
         Args:
-            result: Shazam API response
+            result: Normalized identification ('title', 'artist', 'offset', 'source')
             sample_end_time: Timestamp when audio sample capture ended
-            shazam_duration: How long the Shazam API call took
+            shazam_duration: How long the identification call took
+            sample_duration: Length of the identified sample in seconds
         """
         if not result:
-            print(json.dumps({"status": "Shazam returned None"}), flush=True)
+            print(json.dumps({"status": "No track found"}), flush=True)
+            if self.current_song:
+                # Lost the track we were following; check again soon
+                self.scheduler.disagreed(self.clock())
             return
 
-        if 'track' not in result:
-            print(json.dumps({"status": "Shazam: No track found in result"}), flush=True)
-            return
-
-        track = result['track']
-        title = track.get('title')
-        artist = track.get('subtitle')
+        title = result['title']
+        artist = result['artist']
 
-        # Get Shazam offset (position in song where sample matched)
-        shazam_offset = 0
-        if 'matches' in result and result['matches']:
-            shazam_offset = result['matches'][0].get('offset', 0)
+        # Offset = position in song where sample matched
+        shazam_offset = result['offset']
 
-        print(json.dumps({"status": f"Identified: {title} | offset={shazam_offset:.1f}s | api_time={shazam_duration:.2f}s"}), flush=True)
+        print(json.dumps({"status": f"Identified: {title} | offset={shazam_offset:.1f}s | "
+                                    f"api_time={shazam_duration:.2f}s | source={result.get('source')}"}), flush=True)
 
         # Check if song changed
         is_new_song = (self.current_song != title)
 
         if is_new_song:
-            # New song - reset calibration
+            # New song - reset calibration; old lyrics stop until the new ones arrive
+            self.report_time_to("identify", sample_duration)
+            if self.sample_step < len(PROGRESSIVE_SAMPLE_DURATIONS):
+                self.end_progressive_search()
             self.current_song = title
             self.offset_history = []
             self.sync_drift = 0
+            self.is_playing_lrc = False
+            self.sync_generation += 1
+            self.track_duration = result.get('duration')
+            self.report_calls_per_track(self.scheduler.identified(title, self.clock()))
 
         # Calculate the precise song position at the moment sample ended
         # Shazam offset = where in the song the END of our sample was
@@ -204,10 +610,19 @@ class LyricsApp:
 
         # Calculate song_start_time
         # Shazam offset = position in song where our sample STARTS matching
-        # At sample_end_time, we were at: shazam_offset + SHAZAM_SAMPLE_DURATION
-        # Plus add SYNC_OFFSET_CORRECTION to compensate for system delays
-
-        actual_position_at_sample_end = shazam_offset + SHAZAM_SAMPLE_DURATION + SYNC_OFFSET_CORRECTION
+        # At sample_end_time, we were at: shazam_offset + sample_duration
+        # sample_end_time is when the last block was delivered, which trails the
+        # audio by the measured capture latency. The source's calibrated delay
+        # already includes the device latency, so only its remainder is added.
+        capture_latency = 0.0
+        residual_delay = self.source.calibrated_delay if self.source else 0.0
+        if self.capture:
+            meter = self.capture.latency_meter
+            capture_latency = meter.latency
+            residual_delay = max(0.0, residual_delay - (meter.device_latency or 0.0))
+
+        actual_position_at_sample_end = (shazam_offset + sample_duration + capture_latency
+                                         + residual_delay + SYNC_OFFSET_CORRECTION)
         new_song_start_time = sample_end_time - actual_position_at_sample_end
 
         if is_new_song:
@@ -216,7 +631,7 @@ class LyricsApp:
         else:
             # Recalibration - smoothly adjust to avoid jarring jumps
             # Calculate what our current estimate says the position should be
-            current_time = time.time()
+            current_time = self.clock()
             our_estimated_position = current_time - self.song_start_time
             shazam_estimated_position = current_time - new_song_start_time
 
@@ -232,40 +647,32 @@ class LyricsApp:
                 print(json.dumps({
                     "status": f"Sync correction: drift={drift:.2f}s, applied={correction:.2f}s, total_drift={self.sync_drift:.2f}s"
                 }), flush=True)
+                self.scheduler.disagreed(current_time)
+            else:
+                self.scheduler.agreed()
+        self.update_expected_end()
 
         # Show current calculated position
-        current_time = time.time()
+        current_time = self.clock()
         current_position = current_time - self.song_start_time
         print(json.dumps({"status": f"Current position: {current_position:.1f}s"}), flush=True)
 
         if is_new_song:
-            # Fetch Lyrics for new song
-            print(json.dumps({"status": f"Fetching lyrics for {title}..."}), flush=True)
-            lyrics_data = await self.lyrics_provider.get_lyrics(title, artist)
-            
-            if lyrics_data and lyrics_data.get('syncedLyrics'):
-                print(json.dumps({"status": "Lyrics found!"}), flush=True)
-                self.lyrics_lines = self.lyrics_provider.parse_lrc(lyrics_data['syncedLyrics'])
-                self.is_playing_lrc = True
-                
-                # Send full lyrics to frontend once
-                print(json.dumps({
-                    "type": "lyrics_load",
-                    "lines": self.lyrics_lines,
-                    "track": title,
-                    "artist": artist
-                }), flush=True)
-            else:
-                print(json.dumps({"status": "No synced lyrics found. Using Whisper."}), flush=True)
-                self.is_playing_lrc = False
+            # Fetch Lyrics for new song without holding up capture or sync updates
+            if self.lyrics_task and not self.lyrics_task.done():
+                self.lyrics_task.cancel()
+            self.lyrics_task = self.spawn(
+                self.fetch_lyrics(title, artist, self.track_duration), "lyrics")
 
     async def process_whisper(self, current_time):
         # Transcribe every 3 seconds
         if current_time - self.last_transcription_time > 3.0:
-            if len(self.whisper_buffer) > 0:
+            if self.whisper_cursor.available() > 0:
                 # Run blocking whisper in executor to avoid blocking loop
                 loop = asyncio.get_running_loop()
-                segments = await loop.run_in_executor(None, self.transcribe_sync, self.whisper_buffer)
+                # Copy: the executor thread must not see later writes
+                audio = np.array(self.whisper_cursor.read())
+                segments = await loop.run_in_executor(None, self.transcribe_sync, audio)
                 
                 for seg in segments:
                     print(json.dumps({
@@ -275,7 +682,6 @@ class LyricsApp:
                         "end": seg['end']
                     }), flush=True)
                 
-                self.whisper_buffer = np.array([], dtype=np.float32)
                 self.last_transcription_time = current_time
 
     def transcribe_sync(self, audio):
@@ -287,20 +693,77 @@ class LyricsApp:
 
     def get_loopback_mic(self):
         try:
-            mics = sc.all_microphones(include_loopback=True)
-            for m in mics:
-                if "monitor" in m.name.lower() or "loopback" in m.name.lower():
-                    print(json.dumps({"status": f"Mic: {m.name}"}), flush=True)
-                    return m
-            return sc.default_microphone()
+            mic = get_loopback_device()
         except Exception as e:
             print(json.dumps({"error": f"Mic error: {e}"}), flush=True)
             return None
+        if mic:
+            print(json.dumps({"status": f"Mic: {mic.name}"}), flush=True)
+        else:
+            print(json.dumps({"error": "Mic error: no loopback device"}), flush=True)
+        return mic
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Lyrics Live backend")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="Replay a WAV/FLAC file instead of capturing system audio")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Replay speed: 1 = real time, N = N-times faster, 0 = unpaced")
+    parser.add_argument("--loop", action="store_true", help="Loop the replay file")
+    parser.add_argument("--downmix", choices=DOWNMIX_STRATEGIES, default=DOWNMIX_STRATEGY,
+                        help="How multichannel capture is mixed down to mono")
+    parser.add_argument("--latency", choices=sorted(LATENCY_PROFILES), default=LATENCY_PROFILE,
+                        help="Capture block size profile")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH,
+                        help="Local fingerprint index (built with fingerprint.py)")
+    parser.add_argument("--session-cache", default=SESSION_CACHE_PATH,
+                        help="Where fingerprints of identified songs are remembered")
+    parser.add_argument("--no-session-cache", action="store_true",
+                        help="Always ask Shazam, even for songs heard before")
+    parser.add_argument("--lyrics-cache", default=LYRICS_CACHE_PATH,
+                        help="Where fetched lyrics are cached")
+    parser.add_argument("--no-lyrics-cache", action="store_true",
+                        help="Always fetch lyrics from LRCLIB")
+    parser.add_argument("--lyrics-db", default=LYRICS_DB_PATH,
+                        help="Local LRCLIB database (built with lyrics_db.py)")
+    parser.add_argument("--recognizer-script", metavar="JSON",
+                        help="Use the offline recognizer stand-in with this script instead of Shazam")
+    parser.add_argument("--record-responses", metavar="DIR",
+                        help="Record Shazam responses as a stand-in script in DIR")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    app = LyricsApp()
+    args = parse_args()
+    source = None
+    if args.replay:
+        source = FileReplaySource(args.replay, SAMPLE_RATE, LATENCY_PROFILES[args.latency],
+                                  speed=args.speed, loop=args.loop)
+    fingerprint_index = None
+    if os.path.exists(args.index):
+        fingerprint_index = FingerprintIndex.load(args.index)
+        print(json.dumps({"status": f"Fingerprint index: {len(fingerprint_index)} tracks"}), flush=True)
+    session_cache = None if args.no_session_cache else SessionCache(args.session_cache)
+    lyrics_cache = None if args.no_lyrics_cache else LyricsCache(args.lyrics_cache)
+    lyrics_db = None
+    if os.path.exists(args.lyrics_db):
+        lyrics_db = LyricsDatabase(args.lyrics_db)
+        print(json.dumps({"status": f"Lyrics database: {len(lyrics_db)} tracks"}), flush=True)
+    recognizer = None
+    if args.recognizer_script:
+        recognizer = StandInRecognizer.from_script(args.recognizer_script)
+        print(json.dumps({"status": f"Recognizer stand-in: {args.recognizer_script}"}), flush=True)
+    elif args.record_responses:
+        recognizer = RecordingRecognizer(Shazam(), args.record_responses)
+    app = LyricsApp(source, latency_profile=args.latency, downmix=args.downmix,
+                    fingerprint_index=fingerprint_index, session_cache=session_cache,
+                    recognizer=recognizer, lyrics_cache=lyrics_cache,
+                    lyrics_db=lyrics_db)
     try:
         asyncio.run(app.run())
     except KeyboardInterrupt:
         pass
+    finally:
+        # After asyncio.run: executor threads still remembering songs have finished
+        if session_cache:
+            session_cache.flush()
 
@@ -0,0 +1,123 @@
+"""
+Music Detector Module
+
+Streaming per-block classifier that labels captured audio as silence,
+speech-like or music-like from running RMS and spectral-flux statistics.
+Used to gate identification so we only spend a recognizer call on
+windows that actually contain music.
+"""
+
+import collections
+
+import numpy as np
+
+SILENCE = "silence"
+SPEECH = "speech"
+MUSIC = "music"
+
+# Detector settings
+FRAME_SIZE = 512  # Analysis frame (32 ms at 16 kHz)
+WINDOW_DURATION = 3.0  # Seconds of frame statistics used for a decision
+SILENCE_RMS = 0.004  # ~ mean |int16| of 100, the old "too quiet" threshold
+LOW_ENERGY_SPEECH = 0.5  # Speech: many frames well below the average energy
+FLUX_CV_SPEECH = 1.5  # Speech: bursty spectral change between syllables
+
+
+class MusicDetector:
+    """
+    Classifies a mono stream block by block.
+
+    Each FRAME_SIZE frame contributes its RMS and spectral flux (rectified
+    change of the log-magnitude spectrum) to a rolling window. Speech shows
+    up as a high share of low-energy frames (pauses between words) and
+    bursty flux; music is denser and steadier. Both cues are required:
+    percussion alone makes flux bursty while the energy stays up.
+    """
+
+    def __init__(self, sample_rate, frame_size=FRAME_SIZE, window=WINDOW_DURATION):
+        self.sample_rate = sample_rate
+        self.frame_size = frame_size
+        self.frame_duration = frame_size / sample_rate
+        n = max(4, int(window / self.frame_duration))
+        self._rms = np.zeros(n, dtype=np.float32)
+        self._flux = np.zeros(n, dtype=np.float32)
+        self._count = 0  # Frames seen (saturates the window once >= n)
+        self._pos = 0
+        self._carry = np.zeros(0, dtype=np.float32)
+        self._prev_spectrum = None
+        self._window = np.hanning(frame_size).astype(np.float32)
+
+        # (state, seconds) runs, to answer "how much of the last N s was music"
+        self._history = collections.deque()
+        self._history_duration = 0.0
+        self.max_history = 60.0
+
+        self.state = SILENCE
+        self.rms = 0.0
+
+    def update(self, block):
+        """Feed a block of samples; returns the current state."""
+        data = np.concatenate((self._carry, block)) if len(self._carry) else np.asarray(block)
+        n_frames = len(data) // self.frame_size
+        self._carry = data[n_frames * self.frame_size:].copy()
+        if n_frames == 0:
+            return self.state
+
+        frames = data[:n_frames * self.frame_size].reshape(n_frames, self.frame_size)
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        spectra = np.log1p(np.abs(np.fft.rfft(frames * self._window, axis=1)))
+        previous = spectra[0] if self._prev_spectrum is None else self._prev_spectrum
+        diffs = np.diff(np.vstack((previous, spectra)), axis=0)
+        flux = np.maximum(diffs, 0).mean(axis=1)
+        self._prev_spectrum = spectra[-1]
+
+        size = len(self._rms)
+        idx = (self._pos + np.arange(n_frames)) % size
+        self._rms[idx[-size:]] = rms[-size:]
+        self._flux[idx[-size:]] = flux[-size:]
+        self._pos = (self._pos + n_frames) % size
+        self._count = min(self._count + n_frames, size)
+
+        self.state = self._classify()
+        self._record(self.state, n_frames * self.frame_duration)
+        return self.state
+
+    def _classify(self):
+        rms = self._rms[:self._count]
+        flux = self._flux[:self._count]
+        self.rms = float(np.sqrt(np.mean(rms * rms)))
+        if self.rms < SILENCE_RMS:
+            return SILENCE
+
+        low_energy = float(np.mean(rms < 0.5 * rms.mean()))
+        flux_mean = float(flux.mean())
+        flux_cv = float(flux.std() / flux_mean) if flux_mean > 0 else 0.0
+        if low_energy > LOW_ENERGY_SPEECH and flux_cv > FLUX_CV_SPEECH:
+            return SPEECH
+        return MUSIC
+
+    def _record(self, state, duration):
+        if self._history and self._history[-1][0] == state:
+            self._history[-1][1] += duration
+        else:
+            self._history.append([state, duration])
+        self._history_duration += duration
+        while self._history_duration - self._history[0][1] > self.max_history:
+            self._history_duration -= self._history.popleft()[1]
+
+    def fraction(self, state, seconds):
+        """Share of the last `seconds` classified as `state`."""
+        remaining = seconds
+        matched = 0.0
+        for run_state, duration in reversed(self._history):
+            take = min(duration, remaining)
+            if run_state == state:
+                matched += take
+            remaining -= take
+            if remaining <= 0:
+                break
+        return matched / seconds if seconds > 0 else 0.0
+
+    def level_db(self):
+        """Windowed RMS in dBFS."""
+        return 20 * np.log10(max(self.rms, 1e-9))
@@ -0,0 +1,152 @@
+"""
+Rate Limit Module
+
+Guards for network recognition: a token bucket that caps the request
+rate, and a circuit breaker that stops calling a service that keeps
+failing or throttling us, probing it again after an exponentially
+growing cooldown.
+"""
+
+import collections
+import time
+
+REQUESTS_PER_MINUTE = 20
+BURST = 6  # Requests that may go out back to back (two hedged attempts)
+
+# Circuit breaker settings
+FAILURE_THRESHOLD = 3  # Consecutive failures that open the circuit
+BASE_COOLDOWN = 15.0  # Seconds open before the first half-open probe
+MAX_COOLDOWN = 300.0
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class TokenBucket:
+    """
+    Request budget: refills at `per_minute` tokens per minute up to `burst`.
+
+    A sliding one-minute window of granted requests caps the total as
+    well, so a full burst followed by the steady refill can never exceed
+    `per_minute` requests in any 60 s.
+
+    Exposes the same try_acquire()/available() as any budget the hedger
+    accepts.
+    """
+
+    def __init__(self, per_minute=REQUESTS_PER_MINUTE, burst=BURST, clock=time.monotonic):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self._updated = clock()
+        self._sent = collections.deque()  # Grant times within the last minute
+        self.granted = 0
+        self.rejected = 0
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        while self._sent and now - self._sent[0] >= 60.0:
+            self._sent.popleft()
+
+    def available(self):
+        """Whole requests that may be sent right now."""
+        self._refill()
+        return max(0, min(int(self.tokens), self.per_minute - len(self._sent)))
+
+    def try_acquire(self):
+        if self.available() < 1:
+            self.rejected += 1
+            return False
+        self.tokens -= 1.0
+        self._sent.append(self._updated)
+        self.granted += 1
+        return True
+
+
+class CircuitBreaker:
+    """
+    Closed: calls pass. FAILURE_THRESHOLD consecutive failures (or one
+    throttling response) open it. Open: calls are rejected until the
+    cooldown ends. Half-open: one probe call passes; success closes the
+    circuit, failure reopens it with the cooldown doubled.
+    """
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, base_cooldown=BASE_COOLDOWN,
+                 max_cooldown=MAX_COOLDOWN, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.clock = clock
+
+        self._state = CLOSED
+        self.failures = 0  # Consecutive
+        self.cooldown = base_cooldown
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+        self.opens = 0
+        self.rejected = 0
+
+    @property
+    def state(self):
+        if self._state == OPEN and self.clock() - self.opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+        return self._state
+
+    @property
+    def retry_in(self):
+        """Seconds until the next probe is allowed (0 unless open)."""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.cooldown - self.clock())
+
+    def blocked(self):
+        """True (counted as a rejection) while open, before any call is attempted."""
+        if self.state == OPEN:
+            self.rejected += 1
+            return True
+        return False
+
+    def allow(self):
+        """Whether a call may go out now; counts rejections."""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self._probe_in_flight = False
+        if self._state == OPEN:
+            return  # A call already in flight when the circuit opened; keep cooling down
+        self.failures = 0
+        if self._state != CLOSED:
+            self._state = CLOSED
+            self.cooldown = self.base_cooldown
+
+    def record_failure(self, throttled=False):
+        self.failures += 1
+        if self._state == HALF_OPEN:
+            # Probe failed: back off further
+            self._open(min(self.cooldown * 2, self.max_cooldown))
+        elif self._state == CLOSED and (throttled or self.failures >= self.failure_threshold):
+            self._open(self.base_cooldown)
+        self._probe_in_flight = False
+
+    def release(self):
+        """A call ended without an outcome (cancelled); free the probe slot."""
+        self._probe_in_flight = False
+
+    def _open(self, cooldown):
+        self._state = OPEN
+        self.cooldown = cooldown
+        self.opened_at = self.clock()
+        self.opens += 1
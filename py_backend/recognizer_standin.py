@@ -0,0 +1,247 @@
+"""
+Recognizer Stand-in Module
+
+Local replacement for the Shazam client with the same
+`await recognize(data)` interface, for exercising identify_song and
+SongIdentifier offline. Responses come from a script: entries with a
+reference recording are matched by audio fingerprint (the offset is
+filled in from the match plus the entry's "offset", the song position at
+the start of the recording), the rest are replayed in sequence. Latency,
+network errors and throttling are injected from configurable
+distributions and rates.
+
+Script format (JSON):
+    {
+      "latency": {"distribution": "lognormal", "median": 1.2, "sigma": 0.4},
+      "error_rate": 0.05,
+      "throttle_rate": 0.02,
+      "responses": [{"audio": "song.wav", "offset": 0.0, "response": {...Shazam JSON...}}],
+      "sequence": [{...Shazam JSON...}, {}]
+    }
+
+Scripts are written by RecordingRecognizer from real sessions
+(`main.py --record-responses DIR`) and replayed with
+`main.py --recognizer-script DIR/script.json`.
+"""
+
+import asyncio
+import copy
+import io
+import json
+import os
+import random
+
+import aiohttp
+import numpy as np
+import scipy.io.wavfile as wav
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+from audio_source import load_audio_file
+from fingerprint import FINGERPRINT_SAMPLE_RATE, FingerprintIndex
+
+# Latency distributions: name -> sampler(rng, **params) in seconds
+LATENCY_DISTRIBUTIONS = {
+    "fixed": lambda rng, value=0.0: value,
+    "uniform": lambda rng, low=0.5, high=2.0: rng.uniform(low, high),
+    "normal": lambda rng, mean=1.0, std=0.3: max(0.0, rng.gauss(mean, std)),
+    "lognormal": lambda rng, median=1.0, sigma=0.5: median * rng.lognormvariate(0.0, sigma),
+    "empirical": lambda rng, samples=(1.0,): rng.choice(samples),
+}
+
+# What throttling errors claim to be responding to
+_STANDIN_URL = URL("http://standin.invalid/discovery/v5/recognize")
+_REQUEST_INFO = aiohttp.RequestInfo(_STANDIN_URL, "POST", CIMultiDictProxy(CIMultiDict()), _STANDIN_URL)
+
+
+def parse_latency(spec):
+    """
+    Latency config from a dict or a 'name:arg,arg' string
+    ("lognormal:1.2,0.4", "uniform:0.5,3", "fixed:0.2").
+    """
+    if isinstance(spec, dict):
+        spec = dict(spec)
+        name = spec.pop("distribution", "fixed")
+        params = spec
+    else:
+        name, _, args = str(spec).partition(":")
+        values = [float(v) for v in args.split(",") if v]
+        names = {"fixed": ["value"], "uniform": ["low", "high"],
+                 "normal": ["mean", "std"], "lognormal": ["median", "sigma"]}.get(name)
+        if name == "empirical":
+            params = {"samples": values}
+        elif names is None:
+            params = {}
+        else:
+            params = dict(zip(names, values))
+    if name not in LATENCY_DISTRIBUTIONS:
+        raise ValueError(f"Unknown latency distribution: {name}")
+    return name, params
+
+
+def _decode_wav(data):
+    rate, audio = wav.read(io.BytesIO(bytes(data)))
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    if audio.dtype.kind in "iu":
+        audio = audio / float(np.iinfo(audio.dtype).max + 1)
+    return audio.astype(np.float32), rate
+
+
+class StandInRecognizer:
+    """
+    Scriptable stand-in for shazamio.Shazam.
+
+    Args:
+        responses: [(mono audio at FINGERPRINT_SAMPLE_RATE, Shazam response,
+            song position at the start of the audio)] matched by fingerprint
+        sequence: Shazam responses replayed in order for unmatched queries
+            ({} = no match); the last one repeats once exhausted
+        latency: Distribution name and params (see parse_latency)
+        error_rate: Share of calls failing with a connection error
+        throttle_rate: Share of calls rejected with HTTP 429
+        seed: Random seed for reproducible runs
+    """
+
+    def __init__(self, responses=(), sequence=(), latency="fixed:0", error_rate=0.0,
+                 throttle_rate=0.0, seed=None):
+        self.rng = random.Random(seed)
+        self.latency_name, self.latency_params = parse_latency(latency)
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+
+        self.index = FingerprintIndex()
+        self.indexed_responses = []
+        self.index.add_tracks(self._reference_tracks(responses))
+        self.sequence = list(sequence)
+        self._position = 0
+
+        self.calls = 0
+        self.errors = 0
+        self.throttled = 0
+        self.matched = 0
+        self.latencies = []
+
+    def _reference_tracks(self, responses):
+        for audio, response, offset in responses:
+            track = response.get('track', {})
+            self.indexed_responses.append((response, offset))
+            yield {'title': track.get('title'), 'artist': track.get('subtitle')}, audio
+
+    @classmethod
+    def from_script(cls, path, seed=None):
+        """Load a JSON script; reference audio paths are relative to it."""
+        with open(path) as f:
+            script = json.load(f)
+        base = os.path.dirname(os.path.abspath(path))
+        responses = [(load_audio_file(os.path.join(base, entry["audio"]), FINGERPRINT_SAMPLE_RATE),
+                      entry["response"], entry.get("offset", 0.0))
+                     for entry in script.get("responses", [])]
+        return cls(responses, script.get("sequence", []),
+                   latency=script.get("latency", "fixed:0"),
+                   error_rate=script.get("error_rate", 0.0),
+                   throttle_rate=script.get("throttle_rate", 0.0),
+                   seed=script.get("seed", seed))
+
+    def sample_latency(self):
+        return LATENCY_DISTRIBUTIONS[self.latency_name](self.rng, **self.latency_params)
+
+    async def recognize(self, data, proxy=None, options=None):
+        """Same call shape as shazamio.Shazam.recognize (path or WAV bytes)."""
+        self.calls += 1
+        latency = self.sample_latency()
+        self.latencies.append(latency)
+        await asyncio.sleep(latency)
+
+        roll = self.rng.random()
+        if roll < self.throttle_rate:
+            self.throttled += 1
+            raise aiohttp.ClientResponseError(_REQUEST_INFO, (), status=429, message="Too Many Requests")
+        if roll < self.throttle_rate + self.error_rate:
+            self.errors += 1
+            raise aiohttp.ClientConnectionError("Stand-in: simulated network error")
+
+        if isinstance(data, (str, os.PathLike)):
+            with open(data, "rb") as f:
+                data = f.read()
+        response = self._match(data)
+        if response is not None:
+            self.matched += 1
+            return response
+        return self._next_in_sequence()
+
+    def _match(self, data):
+        if not len(self.index):
+            return None
+        audio, rate = _decode_wav(data)
+        match = self.index.match(audio, rate)
+        if match is None:
+            return None
+        response, offset = self.indexed_responses[match['track_id']]
+        response = copy.deepcopy(response)
+        response['matches'] = [{'offset': offset + match['offset']}]
+        return response
+
+    def _next_in_sequence(self):
+        if not self.sequence:
+            return {}
+        response = self.sequence[min(self._position, len(self.sequence) - 1)]
+        self._position += 1
+        return copy.deepcopy(response)
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else 0.0
+
+        return {
+            'calls': self.calls,
+            'matched': self.matched,
+            'errors': self.errors,
+            'throttled': self.throttled,
+            'latency_p50': percentile(0.5),
+            'latency_p95': percentile(0.95),
+        }
+
+
+class RecordingRecognizer:
+    """
+    Wraps a real recognizer and records its responses as a stand-in script
+    in `directory` (script.json plus one WAV per identified sample).
+    """
+
+    def __init__(self, recognizer, directory):
+        self.recognizer = recognizer
+        self.directory = directory
+        self.script = {"latency": {"distribution": "empirical", "samples": []},
+                       "responses": [], "sequence": []}
+        os.makedirs(directory, exist_ok=True)
+
+    async def recognize(self, data, proxy=None, options=None):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        response = await self.recognizer.recognize(data, proxy=proxy, options=options)
+        self.script["latency"]["samples"].append(round(loop.time() - start, 3))
+
+        if response and 'track' in response and isinstance(data, (bytes, bytearray)):
+            name = f"{len(self.script['responses']):04d}.wav"
+            with open(os.path.join(self.directory, name), "wb") as f:
+                f.write(data)
+            matches = response.get('matches') or [{}]
+            self.script["responses"].append({
+                "audio": name,
+                "offset": matches[0].get('offset', 0.0),  # Song position at the sample start
+                "response": response,
+            })
+        else:
+            # Replayed in order for queries no reference recording matches
+            self.script["sequence"].append(response or {})
+        self.save()
+        return response
+
+    def save(self):
+        path = os.path.join(self.directory, "script.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.script, f, indent=1)
+        os.replace(path + ".tmp", path)
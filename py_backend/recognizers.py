@@ -0,0 +1,341 @@
+"""
+Recognizers Module
+
+Recognizer backends behind one interface, a registry to create them by
+name, and a coordinator that races them. Every backend returns the same
+normalized result: 'title', 'artist', 'offset' (song position at the
+start of the audio), 'duration' (seconds or None) and 'source'.
+
+Backends run in priority order with a head start: a lower-priority
+backend starts once every higher-priority one has finished empty-handed,
+or after HEAD_START seconds per priority step, whichever comes first.
+The first confident result wins and the rest are cancelled.
+"""
+
+import asyncio
+import collections
+import io
+import json
+import time
+
+import aiohttp
+import numpy as np
+import scipy.io.wavfile as wav
+from shazamio import Shazam
+
+from hedging import HedgedRecognizer
+from rate_limit import HALF_OPEN, CircuitBreaker, TokenBucket
+
+SAMPLE_RATE = 16000  # Shazam fingerprints 16 kHz mono; more bandwidth is wasted
+HEAD_START = 0.5  # Seconds a priority tier waits for the tiers above it
+LATENCY_HISTORY = 100  # Latency samples kept per backend
+REQUEST_TIMEOUT = 10.0  # Seconds before a single Shazam request counts as failed
+
+
+def encode_wav(audio_chunk: np.ndarray, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """Encode mono float32 audio as in-memory 16-bit WAV bytes."""
+    audio_int16 = (audio_chunk * 32767).astype(np.int16)
+    buf = io.BytesIO()
+    wav.write(buf, sample_rate, audio_int16)
+    return buf.getvalue()
+
+
+def is_throttled(error):
+    """Whether a recognizer exception means the service is rate limiting us."""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status == 429
+    return "429" in str(error) or "too many requests" in str(error).lower()
+
+
+def parse_shazam_result(result: dict | None) -> dict | None:
+    """
+    Normalize a raw Shazam response.
+
+    Returns:
+        dict with 'title', 'artist', 'offset', 'duration', 'source', 'raw'
+        or None if no track was found
+    """
+    if not result or 'track' not in result:
+        return None
+
+    track = result['track']
+
+    # Get timing offset from matches
+    # This tells us where in the song our sample was captured
+    offset = 0
+    if 'matches' in result and result['matches']:
+        offset = result['matches'][0].get('offset', 0)
+
+    return {
+        'title': track.get('title'),
+        'artist': track.get('subtitle'),
+        'offset': offset,
+        'duration': None,  # Not part of Shazam's match response
+        'source': 'shazam',
+        'raw': result  # Keep raw result for debugging
+    }
+
+
+BACKENDS = {}
+
+
+def register_backend(cls):
+    """Class decorator: make a backend available to create_backend() by its name."""
+    BACKENDS[cls.name] = cls
+    return cls
+
+
+def create_backend(name, **options):
+    return BACKENDS[name](**options)
+
+
+class RecognizerBackend:
+    """
+    Base class for recognizer backends.
+
+    Subclasses set `name`, default `priority` (lower runs first) and
+    `timeout`, and implement recognize().
+    """
+
+    name = None
+    priority = 0
+    timeout = 5.0
+
+    def __init__(self, priority=None, timeout=None):
+        if priority is not None:
+            self.priority = priority
+        if timeout is not None:
+            self.timeout = timeout
+
+    async def recognize(self, audio, sample_rate, sample_duration):
+        """Normalized result for mono `audio`, or None without a confident match."""
+        raise NotImplementedError
+
+    def learn(self, result, audio, sample_rate):
+        """
+        Called (in a worker thread) with another backend's confident result
+        for the same audio.
+        """
+
+    def span_duration(self, sample_duration):
+        """Seconds of audio this backend wants for a `sample_duration` attempt."""
+        return sample_duration
+
+
+@register_backend
+class LocalIndexBackend(RecognizerBackend):
+    """Offline landmark index of the local music library (fingerprint.py)."""
+
+    name = "local"
+    priority = 0
+    timeout = 2.0
+
+    def __init__(self, index, **options):
+        super().__init__(**options)
+        self.index = index
+
+    async def recognize(self, audio, sample_rate, sample_duration):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.index.match, audio, sample_rate)
+
+
+@register_backend
+class SessionCacheBackend(RecognizerBackend):
+    """Fingerprints of songs the network already identified (session_cache.py)."""
+
+    name = "cache"
+    priority = 0
+    timeout = 2.0
+
+    def __init__(self, cache, **options):
+        super().__init__(**options)
+        self.cache = cache
+
+    async def recognize(self, audio, sample_rate, sample_duration):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.cache.lookup, audio, sample_rate)
+
+    def learn(self, result, audio, sample_rate):
+        if result.get('source') != LocalIndexBackend.name:  # The library already knows it
+            self.cache.remember(result, audio, sample_rate)
+
+
+@register_backend
+class ShazamBackend(RecognizerBackend):
+    """
+    Shazam through shazamio (or anything with the same recognize()), on
+    hedged overlapping windows, behind a token bucket and a circuit breaker.
+    While the circuit is open attempts return at once and the local
+    backends carry identification alone.
+    """
+
+    name = "shazam"
+    priority = 1
+    timeout = 20.0
+
+    def __init__(self, recognizer=None, budget=None, breaker=None, **options):
+        super().__init__(**options)
+        self.shazam = recognizer or Shazam()
+        self.budget = budget or TokenBucket()
+        self.breaker = breaker or CircuitBreaker()
+        self.hedger = HedgedRecognizer(self.recognize_once, self.budget)
+
+    async def recognize_once(self, audio, sample_rate):
+        """One request; errors count as no match."""
+        if not self.breaker.allow():
+            return None
+        try:
+            # shazamio accepts the WAV bytes directly, no temp file needed
+            raw = await asyncio.wait_for(
+                self.shazam.recognize(encode_wav(audio, sample_rate)), REQUEST_TIMEOUT)
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception as e:
+            self.breaker.record_failure(throttled=is_throttled(e))
+            print(json.dumps({"error": f"Shazam error: {e}"}), flush=True)
+            return None
+        self.breaker.record_success()
+        return parse_shazam_result(raw)
+
+    async def recognize(self, audio, sample_rate, sample_duration):
+        if self.breaker.blocked():
+            return None
+        # Half-open: a single probe request, not a full set of hedged windows
+        max_windows = 1 if self.breaker.state == HALF_OPEN else None
+        return await self.hedger.identify(audio, sample_rate, sample_duration, max_windows)
+
+    def span_duration(self, sample_duration):
+        return self.hedger.span_duration(sample_duration)
+
+
+class BackendStats:
+    """Per-backend counters and recent latencies."""
+
+    def __init__(self):
+        self.calls = 0
+        self.hits = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.latencies = collections.deque(maxlen=LATENCY_HISTORY)
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.calls if self.calls else 0.0
+
+    @property
+    def median_latency(self):
+        return float(np.median(self.latencies)) if self.latencies else 0.0
+
+    def as_dict(self):
+        return {
+            'calls': self.calls,
+            'hits': self.hits,
+            'hit_rate': self.hit_rate,
+            'timeouts': self.timeouts,
+            'errors': self.errors,
+            'cancelled': self.cancelled,
+            'median_latency': self.median_latency,
+        }
+
+
+class RecognizerCoordinator:
+    """Races backends by priority and returns the first confident result."""
+
+    def __init__(self, backends, head_start=HEAD_START):
+        self.backends = sorted(backends, key=lambda b: b.priority)
+        self.head_start = head_start
+        self.stats = {b.name: BackendStats() for b in self.backends}
+        self._teaching = set()  # Background learn tasks, kept referenced until done
+
+    def backend(self, name):
+        return next((b for b in self.backends if b.name == name), None)
+
+    def span_duration(self, sample_duration):
+        """Seconds of audio to capture so every backend gets what it wants."""
+        return max((b.span_duration(sample_duration) for b in self.backends), default=sample_duration)
+
+    async def _run(self, backend, tasks, audio, sample_rate, sample_duration):
+        # Head start for better-priority backends, cut short once they all came back empty
+        higher = [tasks[b.name] for b in self.backends if b.priority < backend.priority]
+        if higher:
+            steps = len({b.priority for b in self.backends if b.priority < backend.priority})
+            await asyncio.wait(higher, timeout=steps * self.head_start)
+            if any(t.done() and not t.cancelled() and t.result() for t in higher):
+                return None  # Already answered; don't spend a request
+
+        stats = self.stats[backend.name]
+        stats.calls += 1
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(
+                backend.recognize(audio, sample_rate, sample_duration), backend.timeout)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            result = None
+        except asyncio.CancelledError:
+            stats.cancelled += 1
+            raise
+        except Exception as e:
+            print(json.dumps({"error": f"Recognizer {backend.name} error: {e}"}), flush=True)
+            stats.errors += 1
+            result = None
+        stats.latencies.append(time.perf_counter() - start)
+        if not result:
+            return None
+        stats.hits += 1
+        result.setdefault('duration', None)
+        result.setdefault('source', backend.name)
+        return result
+
+    async def identify(self, audio, sample_rate, sample_duration=None):
+        """
+        Race the backends on `audio`.
+
+        Args:
+            sample_duration: Seconds per network request (backends may split
+                longer audio into several windows); defaults to all of it
+        """
+        sample_duration = sample_duration or len(audio) / sample_rate
+        tasks = {}
+        for backend in self.backends:
+            tasks[backend.name] = asyncio.ensure_future(
+                self._run(backend, tasks, audio, sample_rate, sample_duration))
+
+        winner = None
+        try:
+            for next_done in asyncio.as_completed(list(tasks.values())):
+                winner = await next_done
+                if winner:
+                    break
+        finally:
+            pending = [t for t in tasks.values() if not t.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        if winner:
+            # Learning may take a while (fingerprinting, cache writes); don't hold up the result
+            task = asyncio.ensure_future(self._teach(winner, audio, sample_rate))
+            self._teaching.add(task)
+            task.add_done_callback(self._taught)
+        return winner
+
+    def _taught(self, task):
+        self._teaching.discard(task)
+        if not task.cancelled() and task.exception():
+            print(json.dumps({"error": f"Recognizer learn task failed: {task.exception()}"}),
+                  flush=True)
+
+    async def _teach(self, result, audio, sample_rate):
+        """Let the other backends learn from a confident result (runs in the background)."""
+        loop = asyncio.get_running_loop()
+        for backend in self.backends:
+            if backend.name == result['source']:
+                continue
+            try:
+                await loop.run_in_executor(None, backend.learn, result, audio, sample_rate)
+            except Exception as e:
+                print(json.dumps({"error": f"Recognizer {backend.name} learn error: {e}"}), flush=True)
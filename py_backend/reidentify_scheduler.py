@@ -0,0 +1,126 @@
+"""
+Re-identification Scheduler Module
+
+Decides when an already identified track should be identified again.
+While sync measurements keep agreeing the interval backs off; a sync
+disagreement, a failed match or a detected track change brings it back
+to aggressive polling. With a known track duration one probe is
+scheduled just before the expected end, and polling is aggressive again
+once that end has passed.
+"""
+
+BASE_INTERVAL = 10.0  # Seconds between attempts right after identification
+MAX_INTERVAL = 80.0  # Backoff ceiling while everything agrees
+BACKOFF_FACTOR = 2.0
+END_PROBE_LEAD = 8.0  # Probe this many seconds before the expected end
+
+
+class ReidentifyScheduler:
+    """
+    Re-identification timing for the current track, plus calls-per-track
+    bookkeeping.
+
+    Times are in the app clock's seconds. The app calls attempted() for
+    every identification it starts and reports outcomes through agreed(),
+    disagreed(), identified() and boundary().
+    """
+
+    def __init__(self, base_interval=BASE_INTERVAL, max_interval=MAX_INTERVAL):
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        self.interval = base_interval
+        self.next_due = 0.0
+        self.expected_end = None
+        self._end_probed = False
+        self._past_end = False
+
+        self.track = None
+        self.calls = 0  # Attempts made for the current track
+        self.finished_tracks = 0
+        self.finished_calls = 0
+
+    @property
+    def average_calls(self):
+        """Mean identification calls per finished track."""
+        return self.finished_calls / self.finished_tracks if self.finished_tracks else 0.0
+
+    @property
+    def end_probe_time(self):
+        if self.expected_end is None:
+            return None
+        return self.expected_end - END_PROBE_LEAD
+
+    def due(self, now):
+        """True if the current track should be identified again."""
+        if self.expected_end is not None and not self._past_end and now >= self.expected_end:
+            # The track should be over; whatever plays now needs identifying
+            self._past_end = True
+            self.interval = self.base_interval
+            self.next_due = min(self.next_due, now)
+        probe = self.end_probe_time
+        if probe is not None and not self._end_probed and now >= probe:
+            return True
+        return now >= self.next_due
+
+    def attempted(self, now):
+        """An identification attempt was started."""
+        self.calls += 1
+        probe = self.end_probe_time
+        if probe is not None and now >= probe:
+            self._end_probed = True
+        self.next_due = now + self.interval
+
+    def agreed(self):
+        """A measurement confirmed the current sync: back off."""
+        self.interval = min(self.interval * BACKOFF_FACTOR, self.max_interval)
+
+    def disagreed(self, now):
+        """Sync jumped or the track wasn't recognized: poll aggressively again."""
+        self.interval = self.base_interval
+        self.next_due = min(self.next_due, now + self.base_interval)
+
+    def set_expected_end(self, expected_end):
+        """Expected end of the current track (song start + duration), or None."""
+        if (expected_end is None or self.expected_end is None
+                or abs(expected_end - self.expected_end) > END_PROBE_LEAD):
+            # A different end, not just a sync correction of the same one
+            self._end_probed = False
+            self._past_end = False
+        self.expected_end = expected_end
+
+    def identified(self, title, now):
+        """
+        A new track was identified.
+
+        Returns (title, calls) for the track it replaced without a detected
+        boundary, or None.
+        """
+        finished = None
+        if self.track is not None:
+            # The attempt that found the new track counts towards it
+            finished = self._finish(self.calls - 1)
+            self.calls = 1
+        self.track = title
+        self._reset(now + self.base_interval)
+        return finished
+
+    def boundary(self, now):
+        """
+        The track changed (change detector). Returns (title, calls) for the
+        track that ended, or None if nothing was attempted for it.
+        """
+        finished = self._finish(self.calls) if self.track is not None or self.calls else None
+        self.calls = 0
+        self.track = None
+        self._reset(now)
+        return finished
+
+    def _finish(self, calls):
+        self.finished_tracks += 1
+        self.finished_calls += calls
+        return self.track, calls
+
+    def _reset(self, next_due):
+        self.interval = self.base_interval
+        self.next_due = next_due
+        self.set_expected_end(None)
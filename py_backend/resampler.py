@@ -0,0 +1,114 @@
+"""
+Resampler Module
+
+Stateful block-wise polyphase resampling of the capture stream.
+Capture runs at 44.1 kHz but Whisper and fingerprinting only need
+16 kHz, so analyzers read a downsampled copy that is computed once per
+block and shared through its own AudioTimeline.
+"""
+
+from math import gcd
+
+import numpy as np
+from scipy.signal import firwin
+
+from audio_timeline import AudioTimeline
+
+
+class StreamingResampler:
+    """
+    Polyphase FIR resampler that keeps its state across blocks.
+
+    Uses the same anti-aliasing filter as scipy.signal.resample_poly and
+    compensates the filter delay, so output frame m lines up with input
+    time m / out_rate. Feeding a signal block by block gives the same
+    result as resampling it in one go; the price is that the newest
+    `half_width * max(up, down) / up` input frames of each block (under
+    1 ms for 44.1 -> 16 kHz) are only emitted with the next block.
+    """
+
+    def __init__(self, in_rate, out_rate, half_width=10):
+        g = gcd(int(in_rate), int(out_rate))
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.up = int(out_rate) // g
+        self.down = int(in_rate) // g
+
+        max_rate = max(self.up, self.down)
+        half_len = half_width * max_rate
+        h = firwin(2 * half_len + 1, 1.0 / max_rate, window=("kaiser", 5.0)) * self.up
+
+        # Split into `up` phases of `taps` coefficients each
+        self.taps = -(-len(h) // self.up)
+        padded = np.zeros(self.up * self.taps)
+        padded[:len(h)] = h
+        self._phases = padded.reshape(self.taps, self.up).T.astype(np.float32)
+        self._delay = half_len  # Filter delay in upsampled samples
+        self._lags = np.arange(self.taps)
+        self.reset()
+
+    def reset(self, in_frame=0):
+        """Restart the stream at absolute input frame `in_frame` with empty history."""
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        self._in_count = in_frame
+        self.out_count = self._outputs_before(in_frame) if in_frame else 0
+
+    def _outputs_before(self, in_count):
+        # Output m needs input (m * down + delay) // up, so it is ready once
+        # that index is below in_count
+        return max(0, -(-(in_count * self.up - self._delay) // self.down))
+
+    def process(self, block):
+        """Resample one block; returns the output frames that became ready."""
+        buf = np.concatenate((self._history, np.asarray(block, dtype=np.float32)))
+        base = self._in_count - (self.taps - 1)  # Input frame of buf[0]
+        self._in_count += len(block)
+        self._history = buf[len(buf) - (self.taps - 1):]
+
+        m_end = self._outputs_before(self._in_count)
+        if m_end <= self.out_count:
+            return np.zeros(0, dtype=np.float32)
+
+        n = np.arange(self.out_count, m_end) * self.down + self._delay
+        newest = n // self.up - base
+        windows = buf[newest[:, None] - self._lags]
+        out = np.einsum("mk,mk->m", windows, self._phases[n % self.up])
+        self.out_count = m_end
+        return out.astype(np.float32, copy=False)
+
+
+class ResamplingStage:
+    """
+    Publishes the capture stream at additional sample rates.
+
+    Each rate is resampled once per block into its own AudioTimeline,
+    which any number of consumers can read through cursors.
+    """
+
+    def __init__(self, source_rate, rates, duration):
+        self.source_rate = source_rate
+        self.resamplers = {rate: StreamingResampler(source_rate, rate) for rate in rates}
+        self.timelines = {rate: AudioTimeline(rate, duration) for rate in rates}
+        self._next_frame = 0
+
+    def write(self, block, timestamp=None, frame_index=None):
+        """Resample a raw block into every published rate."""
+        if frame_index is not None and frame_index != self._next_frame:
+            # Blocks were dropped upstream; restart filters at the new position
+            for resampler in self.resamplers.values():
+                resampler.reset(frame_index)
+        else:
+            frame_index = self._next_frame
+        self._next_frame = frame_index + len(block)
+
+        for rate, resampler in self.resamplers.items():
+            out_frame = resampler.out_count
+            out = resampler.process(block)
+            out_time = timestamp
+            if timestamp is not None:
+                # Output trails the input by the filter lookahead
+                out_time -= self._next_frame / self.source_rate - resampler.out_count / rate
+            self.timelines[rate].write(out, out_time, out_frame)
+
+    def timeline(self, rate):
+        return self.timelines[rate]
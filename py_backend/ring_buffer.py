@@ -0,0 +1,73 @@
+"""
+Ring Buffer Module
+
+Fixed-capacity float32 ring buffer for captured audio.
+Writing a block costs the same no matter how much audio is already
+buffered, and memory stays flat over multi-hour sessions.
+"""
+
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Fixed-capacity mono float32 ring buffer.
+
+    Every sample is stored twice (at i and i + capacity), so the most
+    recent `capacity` samples are always contiguous in memory and can be
+    handed out as views instead of copies.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        if self.capacity <= 0:
+            raise ValueError("RingBuffer capacity must be positive")
+        self._data = np.zeros(2 * self.capacity, dtype=np.float32)
+        self._head = 0  # Next write position in [0, capacity)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def write(self, samples):
+        """Append samples, overwriting the oldest ones once full."""
+        samples = np.asarray(samples, dtype=np.float32)
+        n = len(samples)
+        if n == 0:
+            return
+        cap = self.capacity
+        if n >= cap:
+            # Only the newest `capacity` samples can survive anyway
+            samples = samples[-cap:]
+            n = cap
+
+        head = self._head
+        first = min(n, cap - head)
+        self._data[head:head + first] = samples[:first]
+        self._data[head + cap:head + cap + first] = samples[:first]
+        rest = n - first
+        if rest:
+            self._data[:rest] = samples[first:]
+            self._data[cap:cap + rest] = samples[first:]
+
+        self._head = (head + n) % cap
+        self._size = min(self._size + n, cap)
+
+    def latest(self, n=None):
+        """
+        Get the last N samples (or everything buffered) as a read-only view.
+
+        The view aliases the buffer, so it is only valid until the next
+        write. Copy it if it has to outlive that.
+        """
+        if n is None or n > self._size:
+            n = self._size
+        end = self._head + self.capacity
+        view = self._data[end - n:end]
+        view.flags.writeable = False
+        return view
+
+    def clear(self):
+        """Forget all buffered samples."""
+        self._head = 0
+        self._size = 0
@@ -0,0 +1,150 @@
+"""
+Session Cache Module
+
+Remembers fingerprints of the windows the network recognizer identified,
+so a song heard again (on repeat, in a looping playlist, after a pause)
+is recognized locally instead of asking Shazam a second time. The cache
+is a FingerprintIndex of partial recordings and persists across restarts.
+"""
+
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from fingerprint import FingerprintIndex, track_landmarks, write_snapshot
+
+SESSION_CACHE_PATH = os.path.expanduser("~/.cache/lyrics-live/session.npz")
+MAX_TRACKS = 200  # Least recently heard songs are evicted beyond this
+MAX_LANDMARKS_PER_TRACK = 30000  # ~3-4 minutes of a song; later windows add nothing
+SAVE_EVERY = 10  # Identified windows remembered between writes of the cache file
+
+
+class SessionCache:
+    """
+    Fingerprints of identified windows, keyed by song.
+
+    Every window Shazam identifies is added to its song's entry at the
+    song position Shazam reported, so later windows from anywhere in the
+    already-heard parts of the song match with a correct offset.
+
+    lookup() and remember() run on executor threads, and a cancelled
+    attempt's remember() keeps running, so both hold a lock on the index.
+    Fingerprinting happens before the lock is taken. The file is rewritten
+    every `save_every` new windows, from a snapshot on a background
+    thread, and by flush().
+    """
+
+    def __init__(self, path=SESSION_CACHE_PATH, max_tracks=MAX_TRACKS, save_every=SAVE_EVERY,
+                 max_landmarks=MAX_LANDMARKS_PER_TRACK):
+        self.path = path
+        self.max_tracks = max_tracks
+        self.save_every = save_every
+        self.max_landmarks = max_landmarks
+        self.index = FingerprintIndex()
+        self.lookups = 0
+        self.hits = 0
+        self._lock = threading.Lock()
+        self._unsaved = 0  # Windows remembered since the last save
+        self._saver = None  # Background thread writing the latest snapshot
+        if path and os.path.exists(path):
+            try:
+                self.index = FingerprintIndex.load(path)
+            except Exception as e:
+                print(json.dumps({"error": f"Session cache unreadable, starting empty: {e}"}), flush=True)
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    @property
+    def network_calls_avoided(self):
+        return self.hits
+
+    def lookup(self, audio, sample_rate):
+        """Match a window against remembered songs; None on a miss."""
+        with self._lock:
+            self.lookups += 1
+            result = self.index.match(audio, sample_rate)
+            if result is None:
+                return None
+            self.hits += 1
+            self.index.tracks[result['track_id']]['last_seen'] = time.time()
+            return result
+
+    def remember(self, result, audio, sample_rate):
+        """
+        Store the fingerprint of an identified window.
+
+        Args:
+            result: Identification with 'title', 'artist', 'offset' (song
+                position at the start of `audio`) and optionally 'duration'
+        """
+        hashes, times = track_landmarks(audio, sample_rate, result.get('offset') or 0.0)
+        key = (result['title'], result.get('artist'))
+        with self._lock:
+            track_id = next((i for i, t in enumerate(self.index.tracks)
+                             if (t['title'], t.get('artist')) == key), None)
+            if track_id is None:
+                self._evict(self.max_tracks - 1)
+                track_id = len(self.index.tracks)
+                self.index.tracks.append({
+                    'title': result['title'],
+                    'artist': result.get('artist'),
+                    'duration': result.get('duration'),
+                })
+            track = self.index.tracks[track_id]
+            track['last_seen'] = time.time()
+            if 'landmarks' not in track:  # Entries saved before counts were kept
+                track['landmarks'] = int(np.count_nonzero(self.index.track_ids == track_id))
+            room = self.max_landmarks - track['landmarks']
+            if room <= 0:
+                return
+            self.index.insert_landmarks(track_id, hashes[:room], times[:room])
+            track['landmarks'] += min(room, len(hashes))
+            self._unsaved += 1
+            if self._unsaved >= self.save_every:
+                self._save_in_background_locked()
+
+    def flush(self):
+        """Write remembered windows that are not on disk yet (call on shutdown)."""
+        saver = self._saver
+        if saver is not None:
+            saver.join()
+        with self._lock:
+            if not self._unsaved or not self.path:
+                return
+            snapshot = self.index.snapshot()
+            self._unsaved = 0
+        self._write(snapshot)
+
+    def _save_in_background_locked(self):
+        if not self.path:
+            self._unsaved = 0
+            return
+        if self._saver is not None and self._saver.is_alive():
+            return  # Still writing; the next window (or flush) saves again
+        snapshot = self.index.snapshot()
+        self._unsaved = 0
+        self._saver = threading.Thread(target=self._write, args=(snapshot,),
+                                       name="session-cache-save", daemon=True)
+        self._saver.start()
+
+    def _write(self, snapshot):
+        try:
+            write_snapshot(self.path, snapshot)
+        except Exception as e:
+            print(json.dumps({"error": f"Session cache save failed: {e}"}), flush=True)
+
+    def _evict(self, limit):
+        excess = len(self.index.tracks) - limit
+        if excess <= 0:
+            return
+        by_age = sorted(range(len(self.index.tracks)),
+                        key=lambda i: self.index.tracks[i].get('last_seen', 0.0))
+        self.index.remove_tracks(by_age[:excess])
@@ -1,61 +1,79 @@
 """
 Song Identifier Module
 
-Uses Shazam (via shazamio) to identify songs from audio samples.
+Identifies songs from audio samples by racing the recognizer backends
+(local fingerprint index, session cache, Shazam via shazamio).
 Returns song title, artist, and timing offset for sync.
 """
 
-import tempfile
 import numpy as np
-import scipy.io.wavfile as wav
-from shazamio import Shazam
 
-SAMPLE_RATE = 44100
+# encode_wav and parse_shazam_result are re-exported for existing callers
+from recognizers import RecognizerCoordinator, create_backend, encode_wav, parse_shazam_result
+
+SAMPLE_RATE = 44100  # AudioCapture's rate; identify() callers at other rates pass theirs
+
+
+def default_backends(local_index=None, session_cache=None, recognizer=None, budget=None,
+                     breaker=None):
+    """Backends for whatever is available: local engines first, then Shazam."""
+    backends = []
+    if local_index is not None:
+        backends.append(create_backend("local", index=local_index))
+    if session_cache is not None:
+        backends.append(create_backend("cache", cache=session_cache))
+    backends.append(create_backend("shazam", recognizer=recognizer, budget=budget, breaker=breaker))
+    return backends
 
 
 class SongIdentifier:
-    """Identifies songs using Shazam's audio fingerprinting."""
+    """
+    Identifies songs using the registered recognizer backends.
+
+    Args:
+        local_index: Optional fingerprint.FingerprintIndex consulted before
+            the network; a confident local match skips Shazam entirely.
+        session_cache: Optional session_cache.SessionCache that remembers
+            Shazam results so repeat plays are recognized locally.
+        recognizer: Object with Shazam's `await recognize(data)` (defaults
+            to shazamio; e.g. recognizer_standin.StandInRecognizer offline).
+        budget: rate_limit.TokenBucket limiting Shazam requests per minute
+        breaker: rate_limit.CircuitBreaker for Shazam failures
+        backends: Explicit list of recognizers.RecognizerBackend, instead
+            of building them from the arguments above
+    """
+
+    def __init__(self, local_index=None, session_cache=None, recognizer=None, budget=None,
+                 breaker=None, backends=None):
+        if backends is None:
+            backends = default_backends(local_index, session_cache, recognizer, budget, breaker)
+        self.coordinator = RecognizerCoordinator(backends)
+
+    def backend(self, name):
+        return self.coordinator.backend(name)
+
+    @property
+    def stats(self):
+        """Per-backend BackendStats by name."""
+        return self.coordinator.stats
 
-    def __init__(self):
-        self.shazam = Shazam()
+    def span_duration(self, sample_duration):
+        """Seconds of audio identify() wants for a `sample_duration` attempt."""
+        return self.coordinator.span_duration(sample_duration)
 
-    async def identify(self, audio_chunk: np.ndarray) -> dict | None:
+    async def identify(self, audio_chunk: np.ndarray, sample_rate: int = SAMPLE_RATE,
+                       sample_duration: float | None = None) -> dict | None:
         """
         Identify a song from an audio chunk.
 
         Args:
             audio_chunk: Mono float32 audio data
+            sample_rate: Sample rate of audio_chunk
+            sample_duration: Seconds per Shazam request; a longer chunk is
+                sent as overlapping hedged windows (default: the whole chunk)
 
         Returns:
-            dict with 'title', 'artist', 'offset' or None if not identified
+            dict with 'title', 'artist', 'offset' (song position at the
+            start of audio_chunk), 'duration', 'source' or None if not identified
         """
-        # Convert float32 to int16 for WAV file
-        audio_int16 = (audio_chunk * 32767).astype(np.int16)
-
-        try:
-            # Save to temp WAV file (shazamio needs a file path)
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-                wav.write(tmp.name, SAMPLE_RATE, audio_int16)
-                result = await self.shazam.recognize(tmp.name)
-
-            if not result or 'track' not in result:
-                return None
-
-            track = result['track']
-
-            # Get timing offset from matches
-            # This tells us where in the song our sample was captured
-            offset = 0
-            if 'matches' in result and result['matches']:
-                offset = result['matches'][0].get('offset', 0)
-
-            return {
-                'title': track.get('title'),
-                'artist': track.get('subtitle'),
-                'offset': offset,
-                'raw': result  # Keep raw result for debugging
-            }
-
-        except Exception as e:
-            print(f"Shazam error: {e}")
-            return None
+        return await self.coordinator.identify(audio_chunk, sample_rate, sample_duration)
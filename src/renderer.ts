@@ -66,6 +66,14 @@ ipcRenderer.on('lyrics-update', (_event: any, data: string) => {
         updateKaraoke(parsed.position);
       }
     }
+    else if (parsed.type === 'track_change') {
+      // Old lyrics no longer apply; wait for the new song
+      currentLyrics = [];
+      lastActiveIndex = -1;
+      uiState = 'loading';
+      showLoadingUI();
+      addLog(parsed.status);
+    }
     else if (parsed.status) {
       // Status/log message
       addLog(parsed.status, parsed.status.includes('Identified') || parsed.status.includes('Lyrics found'));